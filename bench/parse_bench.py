@@ -0,0 +1,179 @@
+"""Offline parse benchmarks for the dealer scrapers.
+
+Record live listing pages once, then benchmark every scraper's parse path
+against them (and against synthetic, scaled-up listings) with no network:
+
+    python -m bench.parse_bench record
+    python -m bench.parse_bench run --sizes 1000,5000,10000
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from core import parsing
+from scrapers import argentorshop, fetch, goldsilver, hollandgold
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# dealer -> (listing URL, parse function taking the page HTML)
+DEALERS = {
+    "goldsilver": (goldsilver.BASE_URL, goldsilver.PLAN.parse),
+    "argentorshop": (argentorshop.URL, argentorshop.PLAN.parse),
+    "hollandgold": (hollandgold.URL, hollandgold.PLAN.parse),
+}
+
+# Roughly what a real category page carries around the product list
+_PAGE_HEAD = "<html><head><title>Zilver</title></head><body>" + "<nav><a href='/x'>menu</a></nav>" * 200
+_PAGE_TAIL = "<footer>" + "<p>footer text</p>" * 500 + "</footer></body></html>"
+
+
+def _goldsilver_card(i: int) -> str:
+    stock = "In voorraad" if i % 3 else "Niet op voorraad"
+    return (
+        '<li class="ajax_block_product col-xs-12 col-sm-4">'
+        f'<h5><a href="https://goldsilver.be/nl/p{i}.html">Maple Leaf 1 oz {i}</a></h5>'
+        f'<span class="price product-price">{80 + i % 50},{i % 100:02d}\xa0€</span>'
+        f'<span class="availability"><span>{stock}</span></span></li>'
+    )
+
+
+def _argentorshop_card(i: int) -> str:
+    qty = ["1 troy ounce", "10 troy ounce", "25 x 1 troy ounce", "1 kilogram"][i % 4]
+    stock = "Op voorraad" if i % 3 else "Uitverkocht"
+    return (
+        '<li class="item product product-item">'
+        f'<a class="product-item-link" href="https://www.argentorshop.be/nl/p{i}/">Philharmoniker {qty} {i}</a>'
+        f'<span class="price">€\xa0{1 + i % 3}.{i % 1000:03d},{i % 100:02d}</span>'
+        f'<span class="text-green-700"> {stock} </span></li>'
+    )
+
+
+def _hollandgold_item(i: int) -> dict:
+    return {
+        "@type": "ListItem",
+        "position": i + 1,
+        "item": {
+            "@type": "Product",
+            "name": f"Britannia {1 + i % 10} troy ounce zilveren munt {i}",
+            "offers": {
+                "@type": "Offer",
+                "availability": "InStock" if i % 3 else "OutOfStock",
+                "price": f"{35 + i % 40}.{i % 100:02d}",
+                "url": f"https://www.hollandgold.nl/p{i}.html",
+            },
+        },
+    }
+
+
+def synthetic_page(dealer: str, cards: int) -> str:
+    """Build a listing page for `dealer` with the given number of product cards."""
+    if dealer == "goldsilver":
+        body = '<ul class="product_list grid">' + "".join(map(_goldsilver_card, range(cards))) + "</ul>"
+    elif dealer == "argentorshop":
+        body = '<ol class="products list items product-items">' + "".join(map(_argentorshop_card, range(cards))) + "</ol>"
+    elif dealer == "hollandgold":
+        item_list = {"@context": "https://schema.org", "@type": "ItemList",
+                     "itemListElement": [_hollandgold_item(i) for i in range(cards)]}
+        body = f'<script type="application/ld+json">{json.dumps(item_list)}</script>'
+    else:
+        raise ValueError(f"Unknown dealer: {dealer}")
+    return _PAGE_HEAD + body + _PAGE_TAIL
+
+
+def record() -> None:
+    """Download each dealer's listing page into the fixture directory."""
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for dealer, (url, _parse) in DEALERS.items():
+        resp = fetch.get(url)
+        resp.raise_for_status()
+        path = os.path.join(FIXTURE_DIR, f"{dealer}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(resp.text)
+        print(f"[Bench] Recorded {dealer}: {len(resp.text) / 1024:.0f} KiB -> {path}")
+
+
+def _recorded_page(dealer: str) -> str | None:
+    """Return the recorded fixture for a dealer, or None if not recorded yet."""
+    path = os.path.join(FIXTURE_DIR, f"{dealer}.html")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def measure(parse, html: str, repeat: int = 3) -> dict:
+    """Time parse(html) (best of `repeat`) and measure its peak traced memory.
+
+    The quantity cache is emptied before every pass, so each one runs the
+    quantity regexes instead of measuring memoized lookups.
+    """
+    best = float("inf")
+    products = []
+    for _ in range(repeat):
+        parsing.clear_cache()
+        start = time.perf_counter()
+        products = parse(html)
+        best = min(best, time.perf_counter() - start)
+
+    # Separate pass: tracemalloc slows allocation down, so it must not skew timing
+    parsing.clear_cache()
+    tracemalloc.start()
+    parse(html)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "products": len(products),
+        "ms_per_page": best * 1000,
+        "products_per_sec": len(products) / best if best > 0 else 0.0,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(sizes: list[int], repeat: int) -> list[dict]:
+    """Benchmark every dealer against its recorded page and each synthetic size."""
+    rows = []
+    for dealer, (_url, parse) in DEALERS.items():
+        fixtures = []
+        recorded = _recorded_page(dealer)
+        if recorded is not None:
+            fixtures.append(("recorded", recorded))
+        fixtures.extend((f"{n} cards", synthetic_page(dealer, n)) for n in sizes)
+
+        for label, html in fixtures:
+            row = {"dealer": dealer, "fixture": label, "kib": len(html) / 1024}
+            row.update(measure(parse, html, repeat))
+            rows.append(row)
+            print(
+                f"{dealer:<13} {label:<12} {row['kib']:>8.0f} KiB  {row['products']:>6} products  "
+                f"{row['ms_per_page']:>9.1f} ms/page  {row['products_per_sec']:>9.0f} products/s  "
+                f"{row['peak_kib']:>9.0f} KiB peak"
+            )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline scraper parse benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("record", help="download live listing pages as fixtures")
+    run_cmd = sub.add_parser("run", help="benchmark parse paths against fixtures")
+    run_cmd.add_argument("--sizes", default="1000,5000,10000",
+                         help="comma-separated synthetic card counts")
+    run_cmd.add_argument("--repeat", type=int, default=3, help="timing repetitions per fixture")
+    run_cmd.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record()
+        return
+
+    rows = run([int(n) for n in args.sizes.split(",") if n], args.repeat)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
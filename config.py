@@ -6,15 +6,78 @@ load_dotenv()
 # --- SilverStack Dashboard ---
 SILVERSTACK_URL = os.getenv("SILVERSTACK_URL", "")
 SILVERSTACK_API_KEY = os.getenv("SILVERSTACK_API_KEY", "")
+DASHBOARD_FULL_SYNC = os.getenv("DASHBOARD_FULL_SYNC", "") == "1"  # Force a full resync this run
+DASHBOARD_FULL_SYNC_HOURS = 24  # Resend every product (not just changes) at least this often
+DASHBOARD_GZIP = os.getenv("DASHBOARD_GZIP", "1") == "1"  # gzip-compress upload bodies
+DASHBOARD_MAX_CONCURRENCY = 4   # Max upload batches in flight at once
+DASHBOARD_BATCH_SIZE = 50       # Starting batch size (adapted to server latency)
+DASHBOARD_MIN_BATCH = 10
+DASHBOARD_MAX_BATCH = 200
+DASHBOARD_TARGET_LATENCY = 2.0  # Seconds; batches shrink when responses are slower than this
+DASHBOARD_MAX_RETRIES = 3       # Retries per batch on 429/5xx or connection errors
+DASHBOARD_RETRY_BASE = 1.0      # Seconds; backoff ceiling doubles with each retry
+DASHBOARD_RETRY_MAX_WAIT = 60   # Never sleep longer than this, even if Retry-After asks to
 
 # --- Telegram Bot (used by Gist sync / worker fallback) ---
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")  # Point at a stub Bot API in tests
+TELEGRAM_CHAT_RATE = 1.0     # Messages per second to one chat (Telegram's per-chat limit)
+TELEGRAM_GLOBAL_RATE = 30.0  # Messages per second across all chats
+TELEGRAM_MAX_RETRIES = 3     # Resends after a 429 / network error before a message is dropped
+ALERT_COALESCE_SECONDS = 5.0  # Deals queued within this window go out as one digest
+ALERT_MAX_ITEMS = 20          # Deals per digest message; larger bursts are split
+ALERT_EVENTS = {"restock", "price_drop"}  # Snapshot events sent to Telegram
+SNAPSHOT_PRICE_DROP_PCT = 1.0  # Price per oz must fall by at least this much to count as a drop
 
 # --- GitHub Gist Sync (for Telegram bot worker) ---
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")
 GIST_ID = os.getenv("GIST_ID", "")
 
+# --- Scraping ---
+REQUEST_TIMEOUT = 15         # Seconds before a dealer request is abandoned
+HOST_REQUEST_INTERVAL = 1.0  # Min seconds between request starts to the same dealer host
+HOST_REQUEST_BURST = 1       # Requests a dealer host may receive back-to-back after being idle
+PAGE_FETCH_WORKERS = 4       # Max concurrent page downloads per paginated dealer
+STREAM_CHUNK_SIZE = 16384    # Bytes per read when streaming a listing page
+DEALER_WORKERS = 4           # Dealers scraped at once; the rest start in order of expected value
+RUN_DEADLINE_SECONDS = float(os.getenv("RUN_DEADLINE_SECONDS", "600"))  # Dealers still scraping after this are abandoned
+HTML_PARSER = os.getenv("HTML_PARSER", "")  # Force a BeautifulSoup backend (default: lxml if installed)
+QUANTITY_CACHE_SIZE = 5000   # Max product names kept in the persisted quantity cache
+
+# --- Dealer health / circuit breaker ---
+HEALTH_FAILURE_THRESHOLD = 3      # Consecutive failed scrapes before a dealer is skipped
+HEALTH_COOLDOWN_MINUTES = 60      # First skip period; doubles with every consecutive re-open
+HEALTH_MAX_COOLDOWN_HOURS = 12
+HEALTH_TIMEOUT_FACTOR = 3.0       # Request timeout = p95 page latency x this ...
+HEALTH_MIN_TIMEOUT = 5            # ... but never below this or above REQUEST_TIMEOUT
+
+# --- Detail page enrichment (image, weight, year, tier prices) ---
+ENRICH_DETAILS = os.getenv("ENRICH_DETAILS", "") == "1"  # Fetch detail pages of new/changed products
+ENRICH_WORKERS = 2          # Concurrent detail page downloads (per-host limits still apply)
+ENRICH_MAX_FETCHES = 50     # Detail pages fetched per run at most; the rest wait for a later run
+ENRICH_TTL_HOURS = 168      # Re-fetch a changed product's details only when older than this
+ENRICH_MAX_ATTEMPTS = 3     # Give up on a failing detail page after this many tries (until ENRICH_TTL_HOURS pass)
+ENRICH_RETRY_MINUTES = 30   # Wait before retrying a failed detail page; doubles with each failure
+
+# --- Instrumentation (run_report.json is always written) ---
+METRICS_PROMETHEUS_FILE = os.getenv("METRICS_PROMETHEUS_FILE", "")  # Also write a Prometheus text snapshot here
+
+# --- Daemon mode (python main.py --daemon) ---
+DAEMON_PERSIST_MINUTES = float(os.getenv("DAEMON_PERSIST_MINUTES", "60"))    # Time between state writes / Gist syncs
+
+# --- Adaptive per-dealer polling (daemon mode) ---
+POLL_MIN_MINUTES = float(os.getenv("POLL_MIN_MINUTES", "5"))   # Poll a constantly changing dealer this often
+POLL_MAX_MINUTES = float(os.getenv("POLL_MAX_MINUTES", "60"))  # Never leave a stable dealer unpolled longer than this
+POLL_EWMA_ALPHA = 0.2     # Weight of the latest poll in the per-dealer change rate
+POLL_BUSY_BOOST = 2.0     # Poll this many times faster during busy hours
+POLL_BUSY_HOURS = {int(h) for h in os.getenv("POLL_BUSY_HOURS", "").split(",") if h.strip()}  # Local hours, e.g. "9,12,18"
+
+# --- Price history (local baselines per product) ---
+HISTORY_RAW_HOURS = 48        # Keep every observation this recent
+HISTORY_HOURLY_DAYS = 30      # Then one per hour up to this age
+HISTORY_RETENTION_DAYS = 365  # Then one per day; older observations are dropped
+
 # --- Legacy: GoldAPI.io keys (no longer used in main flow, kept for fallback) ---
 SILVER_API_KEY = os.getenv("SILVER_API_KEY", "")
 SILVER_API_KEY_2 = os.getenv("SILVER_API_KEY_2", "")
@@ -24,9 +87,20 @@ SILVER_API_KEYS = [k for k in [SILVER_API_KEY, SILVER_API_KEY_2] if k]
 MAX_PREMIUM = 15.00  # Max EUR above spot price per oz to consider a deal
 HARD_CAP = 2500.00   # Absolute max EUR price regardless of spot
 
+# Per product class, by quantity: (class, smallest quantity in oz, max premium EUR/oz over spot, hard cap EUR).
+# Sorted by quantity; used by core.calculator.evaluate_deals
+DEAL_CLASSES = [
+    ("fractional", 0.0, 25.00, HARD_CAP),   # 1/10 .. 1/2 oz coins
+    ("coin", 1.0, MAX_PREMIUM, HARD_CAP),   # 1 oz coins and bars
+    ("tube", 1.01, 12.00, HARD_CAP),        # Tubes, 10 oz bars
+    ("bar", 32.0, 8.00, HARD_CAP),          # Kilo bars, monster boxes
+]
+
 # --- Legacy: Rate Limiting (no longer used in main flow) ---
 REQUEST_DELAY = 5  # Seconds between checks/actions
 MONTHLY_API_LIMIT = 100  # Max silver API requests per calendar month
+QUOTA_FLUSH_EVERY = 10   # Write API usage counters to the state store after this many requests
 
 # --- Legacy: Caching (spot price now provided by SilverStack dashboard) ---
 SPOT_PRICE_CACHE_HOURS = 3  # Reuse cached spot price within this window
+SPOT_PRICE_MAX_STALE_HOURS = 24  # Serve an older price (while refreshing) up to this age
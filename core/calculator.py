@@ -1,6 +1,95 @@
 # LEGACY: Kept as fallback. Primary deal evaluation is now handled by SilverStack dashboard.
+from bisect import bisect_right
+
 import config
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python path gives identical results
+    np = None
+
+# Class used when a product's quantity is unknown: the global MAX_PREMIUM / HARD_CAP
+DEFAULT_CLASS = "default"
+
+
+def _thresholds() -> tuple[list[str], list[float], list[float], list[float]]:
+    """Split config.DEAL_CLASSES into names, lower quantity bounds, premiums and caps."""
+    names, bounds, premiums, caps = [], [], [], []
+    for name, min_oz, max_premium, hard_cap in config.DEAL_CLASSES:
+        names.append(name)
+        bounds.append(min_oz)
+        premiums.append(max_premium)
+        caps.append(hard_cap)
+    return names, bounds, premiums, caps
+
+
+def _evaluate_numpy(price_per_oz, total_price, quantity_oz, spot_price_per_oz: float) -> dict:
+    names, bounds, premiums, caps = _thresholds()
+    ppo = np.asarray(price_per_oz, dtype=float)
+    total = np.asarray(total_price, dtype=float)
+    qty = np.asarray(quantity_oz, dtype=float)
+
+    known = ~np.isnan(qty)
+    idx = np.clip(np.searchsorted(bounds, np.where(known, qty, 0.0), side="right") - 1, 0, len(names) - 1)
+    max_premium = np.where(known, np.take(premiums, idx), config.MAX_PREMIUM)
+    hard_cap = np.where(known, np.take(caps, idx), config.HARD_CAP)
+
+    premium = ppo - spot_price_per_oz
+    return {
+        "premium": premium,
+        "premium_pct": premium / spot_price_per_oz * 100 if spot_price_per_oz else np.zeros_like(premium),
+        "product_class": np.where(known, np.take(names, idx), DEFAULT_CLASS),
+        "is_deal": (premium <= max_premium) & (total <= hard_cap),
+    }
+
+
+def _evaluate_python(price_per_oz, total_price, quantity_oz, spot_price_per_oz: float) -> dict:
+    names, bounds, premiums, caps = _thresholds()
+    result = {"premium": [], "premium_pct": [], "product_class": [], "is_deal": []}
+    for ppo, total, qty in zip(price_per_oz, total_price, quantity_oz):
+        if qty is None or qty != qty:  # None or NaN: quantity unknown
+            name, max_premium, hard_cap = DEFAULT_CLASS, config.MAX_PREMIUM, config.HARD_CAP
+        else:
+            i = min(max(bisect_right(bounds, qty) - 1, 0), len(names) - 1)
+            name, max_premium, hard_cap = names[i], premiums[i], caps[i]
+        premium = ppo - spot_price_per_oz
+        result["premium"].append(premium)
+        result["premium_pct"].append(premium / spot_price_per_oz * 100 if spot_price_per_oz else 0.0)
+        result["product_class"].append(name)
+        result["is_deal"].append(premium <= max_premium and total <= hard_cap)
+    return result
+
+
+def evaluate_deals(price_per_oz, total_price, spot_price_per_oz: float, quantity_oz=None) -> dict:
+    """Evaluate a whole run's products in one pass.
+
+    Takes parallel columns (sequences or arrays) of price_per_oz, total_price
+    and optionally quantity_oz, and returns a dict of equally long columns:
+    premium (EUR/oz over spot), premium_pct, product_class and is_deal.
+    Each product is held to the max premium and hard cap of its class in
+    config.DEAL_CLASSES; products without a quantity use MAX_PREMIUM and
+    HARD_CAP. Columns are NumPy arrays when NumPy is installed, else lists.
+    """
+    if quantity_oz is None:
+        quantity_oz = [None] * len(price_per_oz)
+    if np is not None:
+        quantity_oz = [float("nan") if q is None else q for q in quantity_oz]
+        return _evaluate_numpy(price_per_oz, total_price, quantity_oz, spot_price_per_oz)
+    return _evaluate_python(price_per_oz, total_price, quantity_oz, spot_price_per_oz)
+
+
+def filter_deals(products: list[dict], spot_price_per_oz: float) -> list[dict]:
+    """Return the scraped products that qualify as deals at the given spot price."""
+    if not products:
+        return []
+    result = evaluate_deals(
+        [p["price_per_oz"] for p in products],
+        [p["total_price"] for p in products],
+        spot_price_per_oz,
+        [p.get("quantity_oz") for p in products],
+    )
+    return [p for p, ok in zip(products, result["is_deal"]) if ok]
+
 
 def is_good_deal(price_per_oz: float, spot_price_per_oz: float, total_price: float) -> bool:
     """Determine if a product price qualifies as a buy.
@@ -9,6 +98,4 @@ def is_good_deal(price_per_oz: float, spot_price_per_oz: float, total_price: flo
       1. price_per_oz <= spot_price_per_oz + MAX_PREMIUM
       2. total_price <= HARD_CAP
     """
-    within_premium = price_per_oz <= (spot_price_per_oz + config.MAX_PREMIUM)
-    under_cap = total_price <= config.HARD_CAP
-    return within_premium and under_cap
+    return bool(evaluate_deals([price_per_oz], [total_price], spot_price_per_oz)["is_deal"][0])
@@ -0,0 +1,200 @@
+import re
+import threading
+
+from core import parsing
+from services.state_store import get_store
+
+# Coin series and bar aliases as they appear across the NL/BE/FR dealer sites
+SERIES = [
+    ("maple-leaf", r"maple\s*leaf"),
+    ("britannia", r"britannia"),
+    ("krugerrand", r"krugerrand"),
+    ("philharmonic", r"philharmoni(?:c|ker)|wiener\s*phil"),
+    ("kangaroo", r"kangaroo|kangoeroe|kangourou|k(?:a|ä)nguru"),
+    ("kookaburra", r"kookaburra"),
+    ("koala", r"koala"),
+    ("american-eagle", r"(?:american|silver)\s*eagle"),
+    ("libertad", r"libertad"),
+    ("panda", r"panda"),
+    ("lunar", r"lunar"),
+    ("noahs-ark", r"noah|arche\s*noah|ark\s*van\s*noach"),
+    ("bar", r"baar\b|\b(?:bars?|baren|barre|lingots?|lingotin)\b"),
+]
+_SERIES_RE = [(series, re.compile(pattern, re.IGNORECASE)) for series, pattern in SERIES]
+
+VARIANTS = [
+    ("proof", r"\bproof\b|belle\s*[ée]preuve"),
+    ("colored", r"colou?red|gekleurd|color[ée]|farbe"),
+    ("gilded", r"gilded|verguld|dor[ée]e?"),
+    ("privy", r"privy"),
+]
+_VARIANT_RE = [(variant, re.compile(pattern, re.IGNORECASE)) for variant, pattern in VARIANTS]
+
+_YEAR_RE = re.compile(r"\b(19[5-9]\d|20[0-4]\d)\b")
+
+
+def canonical_key(name: str, quantity_oz: float | None = None) -> str | None:
+    """Map a dealer's product name to a dealer-independent product key.
+
+    The key is series|unit weight|year|variant|pack, e.g.
+    "maple-leaf|1oz|2024|-|x25" for "Tube 25 x 1 oz Maple Leaf 2024".
+    Returns None when the series or weight cannot be recognized, so
+    unrelated products are never merged.
+    """
+    normalized = parsing.normalize(name)
+    series = next((s for s, pattern in _SERIES_RE if pattern.search(normalized)), None)
+    if series is None:
+        return None
+
+    quantity_oz = quantity_oz or parsing.parse_quantity_oz(normalized)
+    if not quantity_oz:
+        return None
+    count = parsing.pack_count(normalized)
+    unit_oz = round(quantity_oz / count, 2)
+
+    year = _YEAR_RE.search(normalized)
+    variants = [v for v, pattern in _VARIANT_RE if pattern.search(normalized)]
+    return "|".join([
+        series,
+        f"{unit_oz:g}oz",
+        year.group(1) if year else "-",
+        "+".join(variants) or "-",
+        f"x{count}",
+    ])
+
+
+class ProductIndex:
+    """Hash index from canonical product key to the cheapest current offer across dealers.
+
+    Products are staged per source while it is being scraped; finish_source()
+    then swaps that source's offers in one pass and recomputes the best offer
+    only for the keys it touched. Sources that failed keep their previous
+    offers. best() is a dict lookup.
+
+    Offers are loaded from the state store on first use, and save() writes
+    back the sources finished since the last save, so one-shot runs see
+    the offers of dealers that failed this time.
+    """
+
+    def __init__(self):
+        self._offers: dict[str, dict[tuple[str, str], dict]] = {}  # key -> {(source, url): offer}
+        self._best: dict[str, dict] = {}
+        self._keys_by_source: dict[str, set[str]] = {}
+        self._pending: dict[str, dict[str, dict[tuple[str, str], dict]]] = {}
+        self._dirty: set[str] = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """Load the persisted offers on first use. Caller must hold _lock."""
+        if self._loaded:
+            return
+        self._loaded = True
+        for source, key, offer in get_store().load_offers():
+            self._offers.setdefault(key, {})[(source, offer["url"])] = offer
+            self._keys_by_source.setdefault(source, set()).add(key)
+        for key, offers in self._offers.items():
+            self._best[key] = min(offers.values(), key=lambda o: o["price_per_oz"])
+
+    def add(self, product: dict, source: str) -> str | None:
+        """Stage one scraped product; returns its canonical key (None if unrecognized)."""
+        key = canonical_key(product["name"], product.get("quantity_oz"))
+        if key is None:
+            return None
+        offer = {**product, "source": source}
+        with self._lock:
+            self._pending.setdefault(source, {}).setdefault(key, {})[(source, product["url"])] = offer
+        return key
+
+    def discard_source(self, source: str) -> None:
+        """Forget the offers a failed or abandoned source staged; its previous offers stay."""
+        with self._lock:
+            self._pending.pop(source, None)
+
+    def finish_source(self, source: str) -> None:
+        """Replace a fully scraped source's offers with the ones staged this run."""
+        with self._lock:
+            self._load()
+            staged = self._pending.pop(source, {})
+            touched = self._keys_by_source.get(source, set()) | set(staged)
+            for key in self._keys_by_source.get(source, ()):
+                offers = self._offers.get(key, {})
+                for offer_id in [o for o in offers if o[0] == source]:
+                    del offers[offer_id]
+            for key, offers in staged.items():
+                self._offers.setdefault(key, {}).update(offers)
+            self._keys_by_source[source] = set(staged)
+            self._dirty.add(source)
+
+            for key in touched:
+                offers = self._offers.get(key)
+                if offers:
+                    self._best[key] = min(offers.values(), key=lambda o: o["price_per_oz"])
+                else:
+                    self._offers.pop(key, None)
+                    self._best.pop(key, None)
+
+    def best(self, key: str) -> dict | None:
+        """Cheapest in-stock offer (by price per oz) for a canonical key, or None."""
+        with self._lock:
+            self._load()
+            return self._best.get(key)
+
+    def best_for_name(self, name: str) -> dict | None:
+        """Cheapest offer for whatever product `name` canonicalizes to."""
+        key = canonical_key(name)
+        return self.best(key) if key else None
+
+    def offers(self, key: str) -> list[dict]:
+        """Every current offer for a key, cheapest first."""
+        with self._lock:
+            self._load()
+            return sorted(self._offers.get(key, {}).values(), key=lambda o: o["price_per_oz"])
+
+    def stats(self) -> dict:
+        """Number of canonical products, and how many are offered by more than one dealer."""
+        with self._lock:
+            self._load()
+            shared = sum(
+                1 for offers in self._offers.values()
+                if len({source for source, _url in offers}) > 1
+            )
+            return {"products": len(self._best), "shared": shared}
+
+    def cheaper_elsewhere(self, product: dict, source: str) -> dict | None:
+        """The best offer for the same product at another dealer, if cheaper per oz than `product`."""
+        key = canonical_key(product["name"], product.get("quantity_oz"))
+        best = self.best(key) if key else None
+        if best and best["source"] != source and best["price_per_oz"] < product["price_per_oz"]:
+            return best
+        return None
+
+    def save(self) -> None:
+        """Persist the offers of the sources finished since the last save."""
+        with self._lock:
+            rows = {
+                source: [
+                    (key, offer)
+                    for key in self._keys_by_source.get(source, ())
+                    for (offer_source, _url), offer in self._offers[key].items()
+                    if offer_source == source
+                ]
+                for source in self._dirty
+            }
+            self._dirty.clear()
+        store = get_store()
+        for source, offers in rows.items():
+            store.replace_offers(source, offers)
+
+
+_index: ProductIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ProductIndex:
+    """Return the process-wide product index (kept warm across daemon cycles)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProductIndex()
+        return _index
@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+REPORT_FILE = os.path.join(ROOT_DIR, "run_report.json")
+
+PROMETHEUS_PREFIX = "silverscout_"
+
+# (name, sorted label items) -> {"count", "sum", "min", "max"}
+_series: dict[tuple[str, tuple], dict] = {}
+_counters: dict[tuple[str, tuple], float] = {}
+_lock = threading.Lock()
+_started = time.time()
+
+
+def _key(name: str, labels: dict) -> tuple[str, tuple]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Record one observation (a latency, a size...) of a labelled metric."""
+    key = _key(name, labels)
+    with _lock:
+        s = _series.get(key)
+        if s is None:
+            _series[key] = {"count": 1, "sum": value, "min": value, "max": value}
+            return
+        s["count"] += 1
+        s["sum"] += value
+        s["min"] = min(s["min"], value)
+        s["max"] = max(s["max"], value)
+
+
+def incr(name: str, amount: float = 1, **labels) -> None:
+    """Add to a labelled counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """Observe the wall-clock seconds spent inside the with block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def summary(name: str, **labels) -> dict | None:
+    """Merge every series of `name` whose labels include `labels` (e.g. all pages of a dealer)."""
+    wanted = {(k, str(v)) for k, v in labels.items()}
+    merged = None
+    with _lock:
+        for (series_name, series_labels), s in _series.items():
+            if series_name != name or not wanted <= set(series_labels):
+                continue
+            if merged is None:
+                merged = dict(s)
+                continue
+            merged["count"] += s["count"]
+            merged["sum"] += s["sum"]
+            merged["min"] = min(merged["min"], s["min"])
+            merged["max"] = max(merged["max"], s["max"])
+    return merged
+
+
+def reset() -> None:
+    """Start a new measurement window (one run or one daemon cycle)."""
+    global _started
+    with _lock:
+        _series.clear()
+        _counters.clear()
+        _started = time.time()
+
+
+def _dealer_summary(series: dict, counters: dict) -> dict:
+    """Roll the per-page series up into one row per dealer."""
+    dealers = {}
+
+    def row(labels: tuple) -> dict | None:
+        dealer = dict(labels).get("dealer")
+        if dealer is None:
+            return None
+        return dealers.setdefault(dealer, {
+            "pages": 0, "fetch_seconds": 0.0, "bytes": 0, "parse_seconds": 0.0,
+            "scrape_seconds": 0.0, "products": 0,
+        })
+
+    for (name, labels), s in series.items():
+        r = row(labels)
+        if r is None:
+            continue
+        if name == "fetch_seconds":
+            r["pages"] += s["count"]
+            r["fetch_seconds"] += s["sum"]
+        elif name == "fetch_bytes":
+            r["bytes"] += int(s["sum"])
+        elif name == "parse_seconds":
+            r["parse_seconds"] += s["sum"]
+        elif name == "scrape_seconds":
+            r["scrape_seconds"] += s["sum"]
+    for (name, labels), value in counters.items():
+        r = row(labels)
+        if r is not None and name == "products":
+            r["products"] += int(value)
+
+    for r in dealers.values():
+        r["products_per_second"] = round(r["products"] / r["scrape_seconds"], 1) if r["scrape_seconds"] else None
+        for field in ("fetch_seconds", "parse_seconds", "scrape_seconds"):
+            r[field] = round(r[field], 3)
+    return dealers
+
+
+def report(**extra) -> dict:
+    """Machine-readable snapshot of the current window, plus any extra top-level fields."""
+    with _lock:
+        series = {k: dict(v) for k, v in _series.items()}
+        counters = dict(_counters)
+        started = _started
+    return {
+        "started_at": started,
+        "duration_seconds": round(time.time() - started, 3),
+        **extra,
+        "dealers": _dealer_summary(series, counters),
+        "series": [
+            {"name": name, "labels": dict(labels), **s}
+            for (name, labels), s in sorted(series.items())
+        ],
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(counters.items())
+        ],
+    }
+
+
+def _prom_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def prometheus_text() -> str:
+    """Current window in the Prometheus text exposition format."""
+    with _lock:
+        series = sorted((k, dict(v)) for k, v in _series.items())
+        counters = sorted(_counters.items())
+
+    lines = []
+    typed = set()
+    for (name, labels), s in series:
+        metric = PROMETHEUS_PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} summary")
+            typed.add(metric)
+        lines.append(f"{metric}_count{_prom_labels(labels)} {s['count']}")
+        lines.append(f"{metric}_sum{_prom_labels(labels)} {s['sum']:.6f}")
+    for (name, labels), value in counters:
+        metric = f"{PROMETHEUS_PREFIX}{name}_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_prom_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(filepath: str = REPORT_FILE, prometheus_path: str = "", **extra) -> dict:
+    """Write the JSON run report and, if a path is given, a Prometheus text snapshot."""
+    data = report(**extra)
+    with open(filepath, "w") as f:
+        json.dump(data, f, indent=2)
+    if prometheus_path:
+        # Write then rename, so a textfile collector never reads a partial file
+        tmp = f"{prometheus_path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(prometheus_text())
+        os.replace(tmp, prometheus_path)
+    return data
@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import config
+
+TROY_OZ_PER_KG = 32.1507
+GRAMS_PER_TROY_OZ = 31.1035
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "quantity_cache.json")
+
+# Bump whenever the patterns below change, so persisted results are recomputed
+PARSER_VERSION = 1
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+_NUM = r"(\d+(?:[.,]\d+)?)"
+_OZ = r"(?:troy\s*ounces?|ounces?|once\s*troy|onces?|unzen?|oz)\b"
+_KG = r"(?:kilograms?|kilogrammes?|kilo|kg)\b"
+_GRAM = r"(?:grams?|grammes?|gr|g)\b"
+
+# Tried in order; the first pattern that matches decides the quantity.
+# "25 x 1 oz" / "500 x 1 troy ounce" / "20 x 1/2 oz" → count × unit size
+_MULTI_RE = re.compile(rf"(\d+)\s*[x×]\s*(?:(\d+)\s*/\s*(\d+)|{_NUM})\s*{_OZ}", re.IGNORECASE)
+# "Monster box 500" / "Maple Leaf monsterbox" → 500 coins of 1 oz unless stated
+_MONSTER_RE = re.compile(r"monster\s*-?\s*box\s*(?:(?:of|van|met)\s+)?(\d{2,3}\b)?", re.IGNORECASE)
+# "1/2 oz" / "1/10 troy ounce"
+_FRACTION_RE = re.compile(rf"(\d+)\s*/\s*(\d+)\s*{_OZ}", re.IGNORECASE)
+# "10 troy ounce" / "1,5 oz"
+_OZ_RE = re.compile(rf"{_NUM}\s*{_OZ}", re.IGNORECASE)
+# "1 kilogram" / "5 kg"
+_KG_RE = re.compile(rf"{_NUM}\s*{_KG}", re.IGNORECASE)
+# "31,1 gram" / "100 g"
+_GRAM_RE = re.compile(rf"{_NUM}\s*{_GRAM}", re.IGNORECASE)
+
+MONSTER_BOX_COINS = 500
+
+_cache: OrderedDict | None = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _number(text: str) -> float:
+    """Parse '1,5' or '1.5' into a float."""
+    return float(text.replace(",", "."))
+
+
+def normalize(text: str) -> str:
+    """Collapse all whitespace (including \xa0) into single regular spaces."""
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def parse_euro(text: str) -> float | None:
+    """Parse European price string like '€ 2.725,24' or '85,80 €' into a float."""
+    try:
+        return float(
+            text.replace("\xa0", "")
+            .replace("€", "")
+            .replace(".", "")   # thousands separator
+            .replace(",", ".")  # decimal separator
+            .strip()
+        )
+    except ValueError:
+        return None
+
+
+def _compute_quantity_oz(name: str) -> float | None:
+    """Extract the troy ounce quantity from a product name (uncached).
+
+    Examples:
+      "500 x 1 troy ounce" / "Tube 25 x 1 oz" → 500 / 25
+      "Monster box 500 Maple Leaf"           → 500
+      "1/2 oz Krugerrand"                     → 0.5
+      "Britannia 1 troy ounce zilveren munt"  → 1.0
+      "1 kilogram" / "5 kg"                   → 32.15 / 160.75
+      "100 gram"                              → 3.22
+    """
+    m = _MULTI_RE.search(name)
+    if m:
+        unit = int(m.group(2)) / int(m.group(3)) if m.group(2) else _number(m.group(4))
+        return float(m.group(1)) * unit
+
+    m = _MONSTER_RE.search(name)
+    if m:
+        return float(m.group(1)) if m.group(1) else float(MONSTER_BOX_COINS)
+
+    m = _FRACTION_RE.search(name)
+    if m and int(m.group(2)):
+        return int(m.group(1)) / int(m.group(2))
+
+    m = _OZ_RE.search(name)
+    if m:
+        return _number(m.group(1))
+
+    m = _KG_RE.search(name)
+    if m:
+        return _number(m.group(1)) * TROY_OZ_PER_KG
+
+    m = _GRAM_RE.search(name)
+    if m:
+        return _number(m.group(1)) / GRAMS_PER_TROY_OZ
+
+    return None
+
+
+def pack_count(name: str) -> int:
+    """Number of coins/bars in a listing: "25 x 1 oz" → 25, "Monster box" → 500, else 1."""
+    m = _MULTI_RE.search(name)
+    if m:
+        return int(m.group(1)) or 1
+    m = _MONSTER_RE.search(name)
+    if m:
+        return int(m.group(1)) if m.group(1) else MONSTER_BOX_COINS
+    return 1
+
+
+def _load(filepath: str = CACHE_FILE) -> OrderedDict:
+    """Read persisted name → quantity results. Returns empty if missing, corrupt or stale."""
+    if not os.path.exists(filepath):
+        return OrderedDict()
+    try:
+        with open(filepath, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return OrderedDict()
+    if data.get("version") != PARSER_VERSION:
+        return OrderedDict()
+    return OrderedDict(data.get("entries", {}))
+
+
+def _get_cache() -> OrderedDict:
+    """Return the in-memory LRU cache. Caller must hold _lock."""
+    global _cache
+    if _cache is None:
+        _cache = _load()
+    return _cache
+
+
+def _lookup(cache: OrderedDict, name: str) -> float | None:
+    """Memoized quantity lookup with LRU eviction. Caller must hold _lock."""
+    if name in cache:
+        cache.move_to_end(name)
+        _stats["hits"] += 1
+        return cache[name]
+
+    _stats["misses"] += 1
+    quantity = _compute_quantity_oz(name)
+    cache[name] = quantity
+    if len(cache) > config.QUANTITY_CACHE_SIZE:
+        cache.popitem(last=False)
+    return quantity
+
+
+def parse_quantity_oz(name: str) -> float | None:
+    """Return the troy ounce quantity for a product name, or None if unknown.
+
+    Results are memoized in a bounded LRU cache that persists across runs.
+    """
+    with _lock:
+        return _lookup(_get_cache(), name)
+
+
+def parse_quantities(names: list[str]) -> list[float | None]:
+    """Batch form of parse_quantity_oz: one lock acquisition for a whole page."""
+    with _lock:
+        cache = _get_cache()
+        return [_lookup(cache, name) for name in names]
+
+
+def parse_batch(names: list[str], price_texts: list[str]) -> list[tuple[float | None, float | None]]:
+    """Parse a whole page's names and European price strings in one call.
+
+    Returns (quantity_oz, total_price) per product, in input order.
+    """
+    return list(zip(parse_quantities(names), map(parse_euro, price_texts)))
+
+
+def clear_cache() -> None:
+    """Start from an empty quantity cache, without loading the persisted one (for benchmarks)."""
+    global _cache
+    with _lock:
+        _cache = OrderedDict()
+
+
+def stats() -> dict:
+    """Return quantity cache hit/miss counters since the last reset_stats()."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats() -> None:
+    """Zero the hit/miss counters (start of a run or daemon cycle)."""
+    with _lock:
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+def save(filepath: str = CACHE_FILE) -> None:
+    """Persist the quantity cache (compact) so the next run starts warm."""
+    with _lock:
+        data = {"version": PARSER_VERSION, "entries": _get_cache()}
+        with open(filepath, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
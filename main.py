@@ -1,25 +1,117 @@
+import argparse
+import cProfile
+import pstats
+import queue
+import signal
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 import config
-from services.dashboard_sync import sync_deals
+from core import catalog, metrics, parsing
+from services.dashboard_client import DashboardClient
+from services.dashboard_sync import StreamingSync
+from services.dashboard_sync import save_state as save_dashboard_state
+from services.enrichment import DetailEnricher
 from services.gist_sync import sync_state_to_gist
-from scrapers.goldsilver import scrape_site as scrape_goldsilver
-from scrapers.argentorshop import scrape_site as scrape_argentorshop
-from scrapers.hollandgold import scrape_site as scrape_hollandgold
+from services.health import DealerHealth
+from services.notifier import AlertQueue
+from services import rate_limiter
+from services.price_history import get_history
+from services.scheduler import AdaptivePoller
+from services.snapshots import get_differ
+from services.state_store import get_store
+from scrapers import fetch, http_cache
+from scrapers import argentorshop, goldsilver, hollandgold
 
-SCRAPERS = [
-    ("goldsilver.be", "goldsilver_be", scrape_goldsilver),
-    ("argentorshop.be", "argentorshop_be", scrape_argentorshop),
-    ("hollandgold.nl", "hollandgold_nl", scrape_hollandgold),
-]
+# Each dealer module declares its SPEC and exposes iter_site()
+DEALERS = (goldsilver, argentorshop, hollandgold)
+SCRAPERS = [(dealer.SPEC.name, dealer.SPEC.source_id, dealer.iter_site) for dealer in DEALERS]
+SPECS = {dealer.SPEC.source_id: dealer.SPEC for dealer in DEALERS}
+HOSTS = {source_id: urlsplit(spec.url).netloc for source_id, spec in SPECS.items()}
 
+# Bounded so a fast scraper cannot run far ahead of the dashboard uploads
+EVENT_QUEUE_SIZE = 1000
 
-def run():
-    print("=" * 50)
-    print("SilverScout - Live Run")
-    print("=" * 50)
+# Longest a run waits at the end for queued Telegram alerts to go out
+ALERT_DRAIN_SECONDS = 30
+
+
+def _emit(events: queue.Queue, event: tuple, deadline: float) -> bool:
+    """Put an event on the queue, waiting no later than `deadline`; False if it was dropped.
+
+    Past the deadline the consumer has stopped reading, so a producer must
+    never block on a full queue (it would keep the process from exiting).
+    """
+    try:
+        events.put(event, timeout=max(0.0, deadline - time.monotonic()))
+    except queue.Full:
+        return False
+    return True
+
+
+def _produce(site_name: str, source_id: str, iter_fn, events: queue.Queue, deadline: float) -> None:
+    """Producer stage: stream one dealer's products onto the event queue.
+
+    Emits ("product", source_id, product) per in-stock product, then exactly
+    one ("done", source_id, count) or ("failed", source_id, count). Failures
+    are contained here so one broken site never affects the others. A dealer
+    still running at `deadline` (monotonic) is abandoned as failed.
+    """
+    count = 0
+    start = time.perf_counter()
+    if time.monotonic() >= deadline:
+        print(f"\n[{site_name}] Skipped, run deadline reached before it could start")
+        _emit(events, ("failed", source_id, count), deadline)
+        return
+    print(f"\nScraping {site_name}...")
+    try:
+        for product in iter_fn():
+            if time.monotonic() >= deadline or not _emit(events, ("product", source_id, product), deadline):
+                raise TimeoutError(f"run deadline of {config.RUN_DEADLINE_SECONDS:.0f}s reached")
+            count += 1
+    except Exception as e:
+        print(f"[{site_name}] Scrape failed: {e}")
+        metrics.incr("scrape_failures", dealer=source_id)
+        _emit(events, ("failed", source_id, count), deadline)
+        return
+    finally:
+        metrics.observe("scrape_seconds", time.perf_counter() - start, dealer=source_id)
+        metrics.incr("products", count, dealer=source_id)
+
+    print(f"[{site_name}] {count} in-stock product(s)")
+    _emit(events, ("done", source_id, count), deadline)
+
+
+def _dispatch_events(events: list[dict], source_id: str, alerts: AlertQueue | None,
+                     index: catalog.ProductIndex) -> None:
+    """Log a finished source's snapshot events and queue the alert-worthy ones.
 
-    # --- Validate config ---
+    Alerts note when another dealer currently offers the same product for less.
+    """
+    if not events:
+        return
+    counts = {}
+    for e in events:
+        counts[e["event"]] = counts.get(e["event"], 0) + 1
+        if alerts and e["event"] in config.ALERT_EVENTS:
+            cheaper = index.cheaper_elsewhere(e, source_id)
+            if cheaper:
+                e = {**e, "cheaper_at": cheaper}
+            alerts.put(e, dedupe=False)
+    print(f"[Events] {source_id}: " + ", ".join(f"{n} {event}" for event, n in sorted(counts.items())))
+
+
+def _alert_queue() -> AlertQueue | None:
+    """An alert queue when Telegram is configured, else None."""
+    if config.TELEGRAM_BOT_TOKEN and config.TELEGRAM_CHAT_ID:
+        return AlertQueue()
+    return None
+
+
+def _missing_config() -> bool:
+    """Print and return True if required dashboard settings are missing."""
     missing = []
     if not config.SILVERSTACK_URL:
         missing.append("SILVERSTACK_URL")
@@ -29,60 +121,280 @@ def run():
     if missing:
         print(f"[Config] Missing env vars: {', '.join(missing)}")
         print("[Config] Copy .env.example to .env and fill in your values.")
-        return
+        return True
+    return False
+
+
+def scrape_and_sync(client: DashboardClient | None = None, persist: bool = True,
+                    sources: list[str] | None = None, poller: AdaptivePoller | None = None,
+                    health: DealerHealth | None = None, alerts: AlertQueue | None = None) -> int:
+    """Scrape dealers and stream the results to the dashboard once.
+
+    Only the given `sources` are scraped (default: all). When a poller is
+    given, each dealer's outcome is recorded so it can reschedule itself.
+    With a DealerHealth, dealers whose circuit breaker is open are skipped,
+    the rest start in order of expected value with latency-derived request
+    timeouts, and each outcome feeds back into their health. Everything
+    must finish within RUN_DEADLINE_SECONDS. As soon as a dealer finishes,
+    its restock and price-drop events are sent to `alerts`, if given.
+    With ENRICH_DETAILS, new and changed products get detail page data.
+    Writes a run report (see core.metrics) and returns the number of
+    in-stock products scraped.
+    """
+    scrapers = [s for s in SCRAPERS if sources is None or s[1] in sources]
+    skipped = []
+    if health:
+        skipped = [s[1] for s in scrapers if not health.allow(s[1])]
+        for source_id in skipped:
+            print(f"\n[Health] Skipping {health.describe(source_id)}")
+        order = health.prioritize([s[1] for s in scrapers if s[1] not in skipped])
+        scrapers = sorted((s for s in scrapers if s[1] in order), key=lambda s: order.index(s[1]))
+        for _site_name, source_id, _iter_fn in scrapers:
+            fetch.set_host_timeout(HOSTS[source_id], health.timeout(source_id))
+            print(f"[Health] {health.describe(source_id)}")
+    deadline = time.monotonic() + config.RUN_DEADLINE_SECONDS
+    fetch.set_deadline(deadline)
+    # Every counter in the run report covers this run (or daemon cycle) only
+    metrics.reset()
+    http_cache.reset_stats()
+    parsing.reset_stats()
+    rate_limiter.host_limiter.reset_stats()
+
+    # --- Scrape all dealer sites concurrently (politeness is enforced per host) ---
+    # Products stream straight into the dashboard consumer, which uploads
+    # full batches while other sites are still being fetched. Every
+    # successfully scraped source is finished, even with zero products, so
+    # items that went out of stock get removed; failed sources are left alone.
+    print("\nScraping and syncing to SilverStack dashboard...")
+    events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+    enricher = DetailEnricher(SPECS) if config.ENRICH_DETAILS else None
+    stream = StreamingSync(client=client, enricher=enricher)
+    history = get_history()
+    index = catalog.get_index()
+    differ = get_differ()
+    total_products = 0
+
+    counts = {}
+    workers = max(1, min(len(scrapers), config.DEALER_WORKERS))
+    pool = ThreadPoolExecutor(max_workers=workers)
+    with metrics.timer("stage_seconds", stage="scrape"):
+        for scraper in scrapers:
+            pool.submit(_produce, *scraper, events, deadline)
+
+        running = {source_id for _site_name, source_id, _iter_fn in scrapers}
+        while running:
+            try:
+                kind, source_id, payload = events.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                # A hung dealer must not hold up the rest: stop waiting and treat it as failed
+                for site_name, source_id, _iter_fn in scrapers:
+                    if source_id not in running:
+                        continue
+                    print(f"\n[{site_name}] Abandoned, run deadline of {config.RUN_DEADLINE_SECONDS:.0f}s reached")
+                    metrics.incr("scrape_abandoned", dealer=source_id)
+                    differ.discard_source(source_id)
+                    index.discard_source(source_id)
+                break
+            if source_id not in running:
+                continue
+            if kind == "product":
+                stream.add(payload, source_id)
+                history.append(source_id, payload["url"], payload["total_price"], payload["price_per_oz"])
+                index.add(payload, source_id)
+                differ.add(payload, source_id)
+                total_products += 1
+                continue
+            running.discard(source_id)
+            counts[source_id] = payload
+            if kind == "done":
+                stream.finish_source(source_id)
+                index.finish_source(source_id)
+                _dispatch_events(differ.finish_source(source_id), source_id, alerts, index)
+            else:
+                # Partial results must not leak into the source's next run
+                differ.discard_source(source_id)
+                index.discard_source(source_id)
+    # Don't join abandoned producers; their downloads stop at the deadline (see fetch.read_until)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    with metrics.timer("stage_seconds", stage="dashboard_drain"):
+        result = stream.close(persist=persist)
+    if enricher:
+        enricher.close()
+        e = enricher.stats
+        print(f"[Enrich] {e['fetched']} fetched, {e['cached']} cached, "
+              f"{e['failed']} failed, {e['deferred']} deferred to a later run, "
+              f"{e['abandoned']} given up on")
+    if alerts:
+        alerts.flush(timeout=ALERT_DRAIN_SECONDS)
+
+    if poller:
+        for _site_name, source_id, _iter_fn in scrapers:
+            signature = stream.signature(source_id) if source_id in stream.finished else None
+            poller.record(source_id, signature)
+        for source_id in skipped:
+            poller.record(source_id, None)
 
-    # --- Scrape all dealer sites ---
-    all_products = []
-    for site_name, source_id, scrape_fn in SCRAPERS:
-        print(f"\nScraping {site_name}...")
-        try:
-            products = scrape_fn()
-            # Tag each product with its source for the dashboard
-            for p in products:
-                p["_source"] = source_id
-            print(f"[{site_name}] {len(products)} in-stock product(s)")
-            all_products.extend(products)
-        except Exception as e:
-            print(f"[{site_name}] Scrape failed: {e}")
-
-        # Rate-limit delay between scrapers
-        time.sleep(5)
-
-    if not all_products:
+    if health:
+        for _site_name, source_id, _iter_fn in scrapers:
+            if source_id in stream.finished:
+                duration = metrics.summary("scrape_seconds", dealer=source_id)
+                latency = metrics.summary("fetch_seconds", dealer=source_id)
+                health.record_success(
+                    source_id, duration["sum"] if duration else 0.0, counts.get(source_id, 0),
+                    latency["max"] if latency else None,
+                )
+            else:
+                health.record_failure(source_id)
+
+    if not total_products:
         print("\nNo in-stock products found across any site.")
     else:
-        print(f"\nTotal: {len(all_products)} in-stock product(s) across {len(SCRAPERS)} site(s).")
-
-    # --- POST products to SilverStack dashboard ---
-    if all_products:
-        print("\nSyncing to SilverStack dashboard...")
-
-        # Group products by source and sync each batch
-        by_source = {}
-        for p in all_products:
-            source = p.pop("_source")
-            by_source.setdefault(source, []).append(p)
-
-        total_sent = 0
-        total_accepted = 0
-        total_errors = []
-        for source_id, products in by_source.items():
-            result = sync_deals(products, source_id)
-            total_sent += result["sent"]
-            total_accepted += result["accepted"]
-            total_errors.extend(result["errors"])
-
-        print(f"\n[Dashboard] Summary: {total_sent} sent, {total_accepted} accepted, {len(total_errors)} error(s)")
-        if total_errors:
-            for err in total_errors:
-                print(f"[Dashboard] Error: {err}")
+        print(f"\nTotal: {total_products} in-stock product(s) across {len(scrapers)} site(s).")
+
+    print(
+        f"\n[Dashboard] Summary: {result['sent']} sent, {result['accepted']} accepted, "
+        f"{result['unchanged']} unchanged, {result['removed']} removed, {len(result['errors'])} error(s)"
+    )
+    if result["errors"]:
+        for err in result["errors"]:
+            print(f"[Dashboard] Error: {err}")
+
+    cache_stats = http_cache.stats()
+    print(
+        f"\n[Cache] {cache_stats['not_modified']} not modified, "
+        f"{cache_stats['unchanged']} unchanged, {cache_stats['parsed']} parsed"
+    )
+    quantity_stats = parsing.stats()
+    print(f"[Cache] Quantity parsing: {quantity_stats['hits']} hit(s), {quantity_stats['misses']} miss(es)")
+    print(f"[Politeness] {rate_limiter.host_limiter.waited:.1f}s spent waiting on dealer host limits")
+    index_stats = index.stats()
+    print(f"[Catalog] {index_stats['products']} canonical product(s), {index_stats['shared']} offered by several dealers")
+
+    metrics.write_report(
+        prometheus_path=config.METRICS_PROMETHEUS_FILE,
+        products=total_products,
+        dashboard={k: v for k, v in result.items() if k != "errors"} | {"errors": len(result["errors"])},
+        cache={**cache_stats, "quantity": quantity_stats},
+        catalog=index_stats,
+    )
+    return total_products
+
+
+def persist_state(poller: AdaptivePoller, health: DealerHealth) -> None:
+    """Write caches and sync state to disk, then mirror it to the Gist."""
+    http_cache.save()
+    parsing.save()
+    save_dashboard_state()
+    poller.save()
+    health.save()
+    get_differ().save()
+    get_history().save()
+    catalog.get_index().save()
+    rate_limiter.flush()
+    get_store().export_json()
 
     # --- Sync state to Gist for Telegram bot (fallback) ---
     sync_state_to_gist()
 
+
+def run():
+    """One-shot run, as used by the hourly GitHub Actions job."""
+    print("=" * 50)
+    print("SilverScout - Live Run")
+    print("=" * 50)
+
+    if _missing_config():
+        return
+
+    # Observations still feed the per-dealer change statistics
+    source_ids = [source_id for _name, source_id, _fn in SCRAPERS]
+    poller = AdaptivePoller(source_ids)
+    health = DealerHealth(source_ids)
+    alerts = _alert_queue()
+    total_products = scrape_and_sync(poller=poller, health=health, alerts=alerts)
+    if alerts:
+        alerts.close(timeout=ALERT_DRAIN_SECONDS)
+    persist_state(poller, health)
+
     print(f"\n{'=' * 50}")
-    print(f"Done. {len(all_products)} product(s) scraped.")
+    print(f"Done. {total_products} product(s) scraped.")
+
+
+def run_daemon():
+    """Long-running mode: scrape on an in-process timer with warm sessions and caches.
+
+    Each dealer is polled on its own adaptive interval (see AdaptivePoller);
+    the loop wakes up whenever the next dealer is due. HTTP sessions, the
+    response and quantity caches and the dashboard fingerprints all stay in
+    memory between cycles; state is persisted every DAEMON_PERSIST_MINUTES
+    and on shutdown (Ctrl+C or SIGTERM).
+    """
+    print("=" * 50)
+    print(f"SilverScout - Daemon ({config.POLL_MIN_MINUTES}-{config.POLL_MAX_MINUTES} min per dealer)")
+    print("=" * 50)
+
+    if _missing_config():
+        return
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: stop.set())
+
+    client = DashboardClient()
+    source_ids = [source_id for _name, source_id, _fn in SCRAPERS]
+    poller = AdaptivePoller(source_ids)
+    health = DealerHealth(source_ids)
+    alerts = _alert_queue()
+    last_persist = time.monotonic()
+    try:
+        while not stop.is_set():
+            due = poller.due()
+            if due:
+                try:
+                    scrape_and_sync(client, persist=False, sources=due, poller=poller, health=health,
+                                    alerts=alerts)
+                except Exception as e:
+                    print(f"[Daemon] Cycle failed: {e}")
+                    for source_id in due:
+                        poller.record(source_id, None)
+                print(f"\n[Daemon] Intervals: {poller.describe()}")
+
+            if time.monotonic() - last_persist >= config.DAEMON_PERSIST_MINUTES * 60:
+                persist_state(poller, health)
+                last_persist = time.monotonic()
+
+            next_in = poller.seconds_until_next()
+            print(f"[Daemon] Next poll in {next_in / 60:.1f} min")
+            stop.wait(next_in)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\n[Daemon] Shutting down, persisting state...")
+        client.close()
+        if alerts:
+            alerts.close(timeout=ALERT_DRAIN_SECONDS)
+        persist_state(poller, health)
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="SilverScout dealer scraper")
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="keep running and poll each dealer on its own adaptive interval instead of once",
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const="silverscout.prof", metavar="PATH",
+        help="run under cProfile and write the stats to PATH (default: silverscout.prof)",
+    )
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(run_daemon if args.daemon else run)
+        profiler.dump_stats(args.profile)
+        print(f"\n[Profile] Wrote {args.profile}; top functions by cumulative time:")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+    elif args.daemon:
+        run_daemon()
+    else:
+        run()
@@ -0,0 +1,98 @@
+import json
+import re
+
+import soupsieve
+
+from core import parsing
+from scrapers.engine import JSON_LD_RE
+from scrapers.parsing import make_soup
+from scrapers.spec import DealerSpec
+
+OG_IMAGE_RE = re.compile(
+    r"<meta[^>]+property=[\"']og:image[\"'][^>]+content=[\"']([^\"']+)", re.IGNORECASE
+)
+# "Jaartal: 2024" / "Year 2024" / "Millésime 2024" in a spec table
+YEAR_RE = re.compile(
+    r"(?:jaartal|jaar|year|ann[ée]e|mill[ée]sime)\W{0,40}?((?:19|20)\d{2})\b", re.IGNORECASE
+)
+# "Gewicht: 31,1 gram" / "Weight 1 oz" / "Poids 1 kg"
+WEIGHT_RE = re.compile(
+    r"(?:gewicht|weight|poids)\W{0,40}?(\d+(?:[.,]\d+)?\s*(?:troy\s*ounces?|oz|kg|kilo|grams?|gr|g)\b)",
+    re.IGNORECASE,
+)
+TAG_RE = re.compile(r"<[^>]+>")
+FIRST_INT_RE = re.compile(r"\d+")
+
+
+def _json_ld_product(html: str) -> dict | None:
+    """Return the first schema.org Product in the page's JSON-LD, if any."""
+    for block in JSON_LD_RE.findall(html):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        if isinstance(data, list):
+            items = data
+        elif isinstance(data, dict):
+            items = data.get("@graph", [data])
+        else:
+            continue
+        for item in items:
+            if isinstance(item, dict) and item.get("@type") == "Product":
+                return item
+    return None
+
+
+def _image(product: dict | None, html: str) -> str | None:
+    image = product.get("image") if product else None
+    if isinstance(image, list):
+        image = image[0] if image else None
+    if isinstance(image, dict):
+        image = image.get("url")
+    if image:
+        return image
+    m = OG_IMAGE_RE.search(html)
+    return m.group(1) if m else None
+
+
+def _tier_prices(spec: DealerSpec, html: str) -> list[dict]:
+    """Quantity discounts as [{min_quantity, price}], from the spec's tier rows."""
+    if not spec.detail_tier_selector:
+        return []
+    tiers = []
+    for row in soupsieve.select(spec.detail_tier_selector, make_soup(html)):
+        quantity = FIRST_INT_RE.search(row.get_text(" "))
+        price_el = row.select_one(".price")
+        price = parsing.parse_euro(price_el.get_text(strip=True)) if price_el else None
+        if quantity and price:
+            tiers.append({"min_quantity": int(quantity.group()), "price": price})
+    return tiers
+
+
+def extract_details(spec: DealerSpec, html: str) -> dict:
+    """Pull per-product extras from a detail page: image_url, weight_oz, mint_year, tier_prices.
+
+    JSON-LD Product data is preferred; the spec table text and og:image
+    are the fallbacks. Keys that cannot be found are left out.
+    """
+    product = _json_ld_product(html)
+    text = parsing.normalize(TAG_RE.sub(" ", html))
+    details = {}
+
+    image = _image(product, html)
+    if image:
+        details["image_url"] = image
+
+    m = WEIGHT_RE.search(text)
+    weight = parsing.parse_quantity_oz(m.group(1)) if m else None
+    if weight:
+        details["weight_oz"] = round(weight, 4)
+
+    m = YEAR_RE.search(text)
+    if m:
+        details["mint_year"] = int(m.group(1))
+
+    tiers = _tier_prices(spec, html)
+    if tiers:
+        details["tier_prices"] = tiers
+    return details
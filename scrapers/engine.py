@@ -0,0 +1,273 @@
+import dataclasses
+import hashlib
+import json
+import re
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import soupsieve
+from bs4 import SoupStrainer
+
+import config
+from core import parsing
+from scrapers import http_cache
+from scrapers.parsing import make_soup, only_class
+from scrapers.spec import DealerSpec
+
+JSON_LD_RE = re.compile(
+    r"""<script[^>]*type=["']application/ld\+json["'][^>]*>(.*?)</script>""",
+    re.DOTALL | re.IGNORECASE,
+)
+
+# Bump whenever the parse code below changes, so cached page results are re-parsed
+PLAN_VERSION = 1
+
+# Only the JSON-LD script tags are built into the parse tree
+JSON_LD = SoupStrainer("script", type="application/ld+json")
+
+
+def _spec_digest(spec: DealerSpec) -> str:
+    """Stable short hash of a spec (frozensets sorted, so it survives hash randomization)."""
+    fields = {
+        k: sorted(v) if isinstance(v, frozenset) else v
+        for k, v in dataclasses.asdict(spec).items()
+    }
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def _product(name: str, url: str, total_price: float, quantity_oz: float) -> dict:
+    """Build the product dict every scraper returns."""
+    return {
+        "name": name,
+        "price_per_oz": round(total_price / quantity_oz, 2),
+        "total_price": total_price,
+        "quantity_oz": round(quantity_oz, 2),
+        "url": url,
+        "in_stock": True,
+    }
+
+
+class ExtractionPlan:
+    """A DealerSpec compiled once into ready-to-run selectors, regexes and strainers.
+
+    All dealers run through the same parse and fetch code; only the plan differs.
+    """
+
+    def __init__(self, spec: DealerSpec):
+        self.spec = spec
+        # Cached page results are only reused when parser, plan code and spec all match
+        self.version = f"{parsing.PARSER_VERSION}.{PLAN_VERSION}.{_spec_digest(spec)}"
+        self.quantity_rules = [
+            (re.compile(rule.pattern, re.IGNORECASE), rule.multiplier)
+            for rule in spec.quantity_rules
+        ]
+        self.page_re = (
+            re.compile(rf"[&?]{re.escape(spec.page_param)}=(\d+)") if spec.page_param else None
+        )
+
+        if spec.kind == "cards":
+            card_css = f"{spec.card_tag or ''}.{spec.card_class}"
+            self.strainer = only_class(spec.card_class, spec.card_tag)
+            self.card_sel = soupsieve.compile(card_css)
+            self.stock_sel = soupsieve.compile(spec.stock_selector)
+            self.link_sel = soupsieve.compile(spec.link_selector)
+            self.price_sel = soupsieve.compile(spec.price_selector)
+            self._parse = self._parse_cards
+        elif spec.kind == "jsonld":
+            self.strainer = JSON_LD
+            self._parse = self._parse_jsonld
+        else:
+            raise ValueError(f"Unknown dealer spec kind: {spec.kind}")
+
+    # --- Parsing ---
+
+    def _rule_quantity(self, name: str) -> float | None:
+        """Apply the dealer's own quantity rules, if any."""
+        for pattern, multiplier in self.quantity_rules:
+            m = pattern.search(name)
+            if m:
+                return float(m.group(1)) * multiplier
+        return None
+
+    def quantities_oz(self, names: list[str]) -> list[float | None]:
+        """Return the troy ounce quantity for each product name (None if unknown)."""
+        if self.spec.fixed_quantity_oz is not None:
+            return [self.spec.fixed_quantity_oz] * len(names)
+        if not self.quantity_rules:
+            return parsing.parse_quantities(names)
+        return [self._rule_quantity(n) or parsing.parse_quantity_oz(n) for n in names]
+
+    def parse(self, html: str) -> list[dict]:
+        """Parse one listing page into in-stock products."""
+        return self._parse(html)
+
+    def _parse_cards(self, html: str) -> list[dict]:
+        soup = make_soup(html, self.strainer)
+        names, urls, price_texts = [], [], []
+
+        for card in self.card_sel.select(soup):
+            # --- Stock status (strict match) ---
+            stock_tag = self.stock_sel.select_one(card)
+            if not stock_tag:
+                continue
+            if parsing.normalize(stock_tag.get_text()) not in self.spec.in_stock_texts:
+                continue
+
+            # --- Product name & URL ---
+            link_tag = self.link_sel.select_one(card)
+            if not link_tag:
+                continue
+
+            # --- Total price ---
+            price_tag = self.price_sel.select_one(card)
+            if not price_tag:
+                continue
+
+            names.append(link_tag.get_text(strip=True))
+            urls.append(link_tag.get("href", ""))
+            price_texts.append(price_tag.get_text(strip=True))
+
+        # --- Quantity & price for the whole page in one batch ---
+        parsed = zip(self.quantities_oz(names), map(parsing.parse_euro, price_texts))
+
+        products = []
+        for name, product_url, (quantity_oz, total_price) in zip(names, urls, parsed):
+            if total_price is None or not quantity_oz:
+                continue
+            products.append(_product(name, product_url, total_price, quantity_oz))
+        return products
+
+    def _parse_jsonld(self, html: str) -> list[dict]:
+        soup = make_soup(html, self.strainer)
+        names, urls, prices = [], [], []
+
+        for script_tag in soup.find_all("script"):
+            try:
+                raw = json.loads(script_tag.string)
+            except (json.JSONDecodeError, TypeError):
+                continue
+
+            # JSON-LD may be a single object or a list of objects
+            entries = raw if isinstance(raw, list) else [raw]
+            for entry in entries:
+                if not isinstance(entry, dict) or entry.get("@type") != "ItemList":
+                    continue
+
+                for item in entry.get("itemListElement", []):
+                    product = item if item.get("@type") == "Product" else item.get("item", {})
+                    if product.get("@type") != "Product":
+                        continue
+
+                    offers = product.get("offers", {})
+                    if offers.get("availability") != self.spec.in_stock_availability:
+                        continue
+
+                    name = product.get("name", "")
+                    try:
+                        total_price = float(offers.get("price", 0))
+                    except (ValueError, TypeError):
+                        continue
+                    if total_price <= 0:
+                        continue
+
+                    names.append(name)
+                    urls.append(offers.get("url", ""))
+                    prices.append(total_price)
+
+        # --- Quantity for the whole page in one batch ---
+        products = []
+        for name, product_url, total_price, quantity_oz in zip(names, urls, prices, self.quantities_oz(names)):
+            if not quantity_oz:
+                continue
+            products.append(_product(name, product_url, total_price, quantity_oz))
+        return products
+
+    # --- Pagination & change detection ---
+
+    def last_page(self, html: str) -> int:
+        """Detect the highest page number from pagination links."""
+        if not self.page_re:
+            return 1
+        pages = {1}
+        for match in self.page_re.finditer(html):
+            pages.add(int(match.group(1)))
+        return max(pages)
+
+    def page_url(self, page: int) -> str:
+        """Return the listing URL for a 1-based page number."""
+        if page == 1:
+            return self.spec.url
+        separator = "&" if "?" in self.spec.url else "?"
+        return f"{self.spec.url}{separator}{self.spec.page_param}={page}"
+
+    def region(self, html: str) -> str:
+        """Everything on the page that can change what we return, sliced without parsing."""
+        if self.spec.kind == "jsonld":
+            region = "".join(JSON_LD_RE.findall(html)) or html
+        elif self.spec.region_markers:
+            region = http_cache.region_between(html, *self.spec.region_markers)
+        else:
+            region = html
+        if self.page_re:
+            region = f"{region}|pages={self.last_page(html)}"
+        return region
+
+    # --- Fetching ---
+
+    def _parse_first_page(self, html: str) -> dict:
+        """Parse page 1, which also carries the pagination we need."""
+        return {"last_page": self.last_page(html), "products": self.parse(html)}
+
+    def _labels(self, page: int) -> dict:
+        return {"dealer": self.spec.source_id, "page": page}
+
+    def _scrape_page_number(self, page: int) -> list[dict]:
+        """Download and parse one listing page by number."""
+        return http_cache.fetch_parsed(self.page_url(page), self.parse, self.region, self._labels(page),
+                                       self.spec.stream_stop_markers, self.version)
+
+    def iter_products(self) -> Iterator[dict]:
+        """Yield the dealer's in-stock products as each listing page is parsed.
+
+        Page 1 is downloaded once and used for both pagination discovery and
+        parsing; pages 2..N are then fetched concurrently and yielded in page
+        order as soon as each is ready, so consumers can start before the
+        whole catalog has been downloaded.
+
+        Yields dicts with keys:
+            name, price_per_oz, total_price, quantity_oz, url, in_stock.
+        """
+        if not self.page_re:
+            yield from http_cache.fetch_parsed(self.spec.url, self.parse, self.region, self._labels(1),
+                                               self.spec.stream_stop_markers, self.version)
+            return
+
+        first = http_cache.fetch_parsed(self.page_url(1), self._parse_first_page, self.region, self._labels(1),
+                                        self.spec.stream_stop_markers, self.version)
+        last_page = first["last_page"]
+        print(f"[{self.spec.name}] {last_page} page(s) detected.")
+        print(f"[{self.spec.name}] Page 1: {len(first['products'])} product(s)")
+        yield from first["products"]
+        if last_page == 1:
+            return
+
+        workers = min(config.PAGE_FETCH_WORKERS, last_page - 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                # map() yields results in submission order, i.e. page order
+                pages = pool.map(self._scrape_page_number, range(2, last_page + 1))
+                for page, products in enumerate(pages, start=2):
+                    print(f"[{self.spec.name}] Page {page}: {len(products)} product(s)")
+                    yield from products
+            finally:
+                # A failed page or an abandoned consumer: don't download the rest
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def scrape(self) -> list[dict]:
+        """Scrape every listing page of the dealer and return all in-stock products."""
+        return list(self.iter_products())
+
+
+def compile_spec(spec: DealerSpec) -> ExtractionPlan:
+    """Compile a dealer spec into an extraction plan (do this once, at import time)."""
+    return ExtractionPlan(spec)
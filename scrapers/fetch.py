@@ -0,0 +1,94 @@
+import codecs
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+import config
+from services.rate_limiter import host_limiter
+
+_session = requests.Session()
+
+# Per-host request timeouts derived from observed latency (see services.health)
+_host_timeouts: dict[str, float] = {}
+
+# Monotonic time after which listing downloads are abandoned (None: no limit)
+_deadline: float | None = None
+
+
+def set_host_timeout(host: str, seconds: float) -> None:
+    """Override REQUEST_TIMEOUT for one dealer host."""
+    _host_timeouts[host] = seconds
+
+
+def set_deadline(deadline: float | None) -> None:
+    """Set the run deadline (monotonic) that listing downloads must finish by."""
+    global _deadline
+    _deadline = deadline
+
+
+def check_deadline() -> None:
+    """Raise TimeoutError once the run deadline has passed."""
+    if _deadline is not None and time.monotonic() >= _deadline:
+        raise TimeoutError("run deadline reached")
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET a dealer URL over the shared session, respecting per-host politeness.
+
+    Slots come from a token bucket per host: reserved under a lock and slept
+    on outside it, so requests to different hosts never wait on each other.
+    """
+    host = urlsplit(url).netloc
+    host_limiter.acquire(host)
+    kwargs.setdefault("timeout", _host_timeouts.get(host, config.REQUEST_TIMEOUT))
+    return _session.get(url, **kwargs)
+
+
+def read_until(resp: requests.Response, stop_markers: tuple[str, ...] = ()) -> tuple[str, int, bool]:
+    """Decode a streamed (stream=True) response chunk by chunk.
+
+    Reading stops as soon as every stop marker has been seen in order, and
+    the text is cut right after the last one; the rest of the body is never
+    downloaded. Without markers, or if they never all appear, the whole
+    body is read. The response is always closed.
+
+    The run deadline (see set_deadline) is checked between chunks, so a
+    server trickling bytes cannot keep a dealer running past it.
+
+    Returns (text, bytes_read, cut_off).
+    """
+    decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+    pending = list(stop_markers)
+    parts = []
+    nbytes = 0
+    offset = 0   # Characters decoded before the current chunk
+    tail = ""    # End of the previous chunk, so markers split across chunks are found
+    try:
+        for chunk in resp.iter_content(config.STREAM_CHUNK_SIZE):
+            check_deadline()
+            nbytes += len(chunk)
+            text = decoder.decode(chunk)
+            parts.append(text)
+            if not pending:
+                offset += len(text)
+                continue
+
+            window = tail + text
+            window_start = offset - len(tail)
+            pos = 0
+            while pending:
+                found = window.find(pending[0], pos)
+                if found == -1:
+                    break
+                pos = found + len(pending.pop(0))
+            if not pending:
+                return "".join(parts)[: window_start + pos], nbytes, True
+
+            keep = max(len(m) for m in pending) - 1
+            tail = window[max(pos, len(window) - keep):]
+            offset += len(text)
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts), nbytes, False
+    finally:
+        resp.close()
@@ -0,0 +1,151 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+
+from core import metrics
+from scrapers import fetch
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "http_cache.json")
+
+_entries: dict | None = None
+_lock = threading.Lock()
+_stats = {"not_modified": 0, "unchanged": 0, "parsed": 0}
+
+
+def _load(filepath: str = CACHE_FILE) -> dict:
+    """Read cache entries from JSON file. Returns empty dict if missing or corrupt."""
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        with open(filepath, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def _get_entries() -> dict:
+    """Return the in-memory cache, loading it from disk on first use."""
+    global _entries
+    with _lock:
+        if _entries is None:
+            _entries = _load()
+        return _entries
+
+
+def save(filepath: str = CACHE_FILE) -> None:
+    """Write the cache to disk (compact, it is never read by humans)."""
+    entries = _get_entries()
+    with _lock:
+        with open(filepath, "w") as f:
+            json.dump(entries, f, separators=(",", ":"))
+
+
+def stats() -> dict:
+    """Return hit/miss counters since the last reset_stats().
+
+    not_modified: server answered 304, unchanged: region hash matched,
+    parsed: the page had to be parsed.
+    """
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats() -> None:
+    """Zero the hit/miss counters (start of a run or daemon cycle)."""
+    with _lock:
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+def region_between(html: str, start_marker: str, end_marker: str) -> str:
+    """Cheaply slice out the product-list region of a page without parsing it.
+
+    The region runs from the first start_marker to the first end_marker after
+    the last start_marker. Falls back to the whole page if a marker is missing.
+    """
+    start = html.find(start_marker)
+    if start == -1:
+        return html
+    end = html.find(end_marker, html.rfind(start_marker))
+    if end == -1:
+        return html[start:]
+    return html[start:end + len(end_marker)]
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def fetch_parsed(url: str, parse, region=None, labels: dict | None = None,
+                 stop_markers: tuple[str, ...] = (), version: str = ""):
+    """Fetch a URL and return parse(html), reusing the previous run's result when possible.
+
+    Sends If-None-Match / If-Modified-Since from the last response. On a 304,
+    or when the hash of region(html) matches the previous run, the cached
+    result is returned and parse() is never called. parse() must return a
+    JSON-serializable value. `version` identifies the parser that produced
+    the result; an entry stored under another version counts as a miss, so
+    parser changes take effect without waiting for the page to change.
+
+    The body is streamed and the download stops once `stop_markers` have
+    all been seen (see fetch.read_until), so html is the page up to there.
+
+    Fetch latency, time to first byte, bytes downloaded, parse time and the
+    cache outcome are recorded in core.metrics under `labels` (e.g. dealer, page).
+    """
+    labels = labels or {}
+    entries = _get_entries()
+    with _lock:
+        entry = entries.get(url)
+    if entry and entry.get("version") != version:
+        entry = None
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    fetch.check_deadline()
+    start = time.perf_counter()
+    resp = fetch.get(url, headers=headers, stream=True)
+    metrics.observe("fetch_ttfb_seconds", resp.elapsed.total_seconds(), **labels)
+    if resp.status_code == 304 and entry:
+        resp.close()
+        with _lock:
+            _stats["not_modified"] += 1
+        metrics.incr("pages", outcome="not_modified", **labels)
+        return copy.deepcopy(entry["result"])
+    if not resp.ok:
+        resp.close()
+    resp.raise_for_status()
+
+    html, nbytes, cut_off = fetch.read_until(resp, stop_markers)
+    metrics.observe("fetch_seconds", time.perf_counter() - start, **labels)
+    metrics.observe("fetch_bytes", nbytes, **labels)
+    if cut_off:
+        metrics.incr("stream_cutoffs", **labels)
+    digest = _hash(region(html) if region else html)
+    if entry and entry.get("region_hash") == digest:
+        counter = "unchanged"
+        result = entry["result"]
+    else:
+        counter = "parsed"
+        with metrics.timer("parse_seconds", **labels):
+            result = parse(html)
+    metrics.incr("pages", outcome=counter, **labels)
+
+    with _lock:
+        _stats[counter] += 1
+        entries[url] = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "region_hash": digest,
+            "version": version,
+            "result": result,
+        }
+    return copy.deepcopy(result)
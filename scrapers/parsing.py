@@ -0,0 +1,43 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+import config
+
+
+def _pick_backend() -> str:
+    """Return the fastest available BeautifulSoup tree builder.
+
+    lxml is C-backed and several times faster than the pure-Python
+    html.parser; HTML_PARSER in the environment overrides the choice.
+    """
+    if config.HTML_PARSER:
+        return config.HTML_PARSER
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+BACKEND = _pick_backend()
+
+
+def only_class(class_name: str, tag: str | None = None) -> SoupStrainer:
+    """Build a strainer matching elements that carry `class_name` among their classes.
+
+    Matched as a whole token against the raw attribute, since the class list
+    is not split yet while the parser is filtering.
+    """
+    pattern = re.compile(rf"(?:^|\s){re.escape(class_name)}(?:\s|$)")
+    return SoupStrainer(tag, class_=pattern)
+
+
+def make_soup(html: str, only: SoupStrainer | None = None) -> BeautifulSoup:
+    """Parse HTML with the selected backend.
+
+    When `only` is given, just the matching elements (and their children)
+    are built into the tree; the rest of the page is skipped, which saves
+    both CPU time and memory on large listings.
+    """
+    return BeautifulSoup(html, BACKEND, parse_only=only)
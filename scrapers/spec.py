@@ -0,0 +1,52 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class QuantityRule:
+    """Regex whose first group, times `multiplier`, is the quantity in troy ounces."""
+
+    pattern: str
+    multiplier: float = 1.0
+
+
+@dataclass(frozen=True)
+class DealerSpec:
+    """Declarative description of how to scrape one dealer's listing.
+
+    kind="cards" reads HTML product cards with CSS selectors; kind="jsonld"
+    reads a schema.org ItemList from <script type="application/ld+json">.
+    """
+
+    name: str
+    source_id: str
+    url: str
+    kind: str = "cards"
+
+    # --- Product cards (kind="cards") ---
+    card_tag: str | None = None
+    card_class: str = ""
+    stock_selector: str = ""
+    in_stock_texts: frozenset[str] = frozenset()
+    link_selector: str = ""
+    price_selector: str = ""
+
+    # --- JSON-LD (kind="jsonld") ---
+    in_stock_availability: str = "InStock"
+
+    # --- Quantity: a fixed amount, or the first matching dealer rule on the product
+    # name, falling back to the shared parser in core.parsing ---
+    fixed_quantity_oz: float | None = None
+    quantity_rules: tuple[QuantityRule, ...] = field(default_factory=tuple)
+
+    # --- Pagination: query parameter carrying the page number, if the listing pages ---
+    page_param: str | None = None
+
+    # --- Product-list region used for change detection: (start marker, end marker) ---
+    region_markers: tuple[str, str] | None = None
+
+    # --- Detail pages (optional enrichment): rows of quantity-discount prices ---
+    detail_tier_selector: str = ""
+
+    # --- Streaming cut-off: stop downloading once these markers have appeared, in order.
+    # Must come after everything parse() and the pagination need ---
+    stream_stop_markers: tuple[str, ...] = ()
@@ -0,0 +1,189 @@
+import gzip
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from core import metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Answers to DELETE meaning "this server does not do removals" rather than
+# "try again": non-retryable client errors (auth aside) and 501
+AUTH_STATUSES = {401, 403}
+
+# Answers to a gzip body meaning "send it uncompressed"
+GZIP_REJECTED_STATUSES = {400, 415}
+
+
+def _retry_after(resp: requests.Response) -> float | None:
+    """Return the server-requested wait in seconds from a Retry-After header, if any."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class DashboardClient:
+    """Pooled, concurrent and retrying transport for SilverStack batch uploads.
+
+    One keep-alive session is shared by all uploads. Batches are sent up to
+    `max_concurrency` at a time with gzip-compressed JSON bodies, retried on
+    transient failures with jittered exponential backoff (honoring
+    Retry-After), and sized adaptively from observed response latency.
+    If the server rejects a compressed body (415, or 400), compression is
+    switched off for the client and the request is resent uncompressed.
+    """
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None,
+                 max_concurrency: int | None = None):
+        base_url = base_url or config.SILVERSTACK_URL
+        self.url = f"{base_url.rstrip('/')}/api/deals"
+        self.max_concurrency = max_concurrency or config.DASHBOARD_MAX_CONCURRENCY
+        self.batch_size = config.DASHBOARD_BATCH_SIZE
+        self.retries = 0
+        self.removal_supported = True  # Cleared when the server rejects DELETE outright
+        self.gzip = config.DASHBOARD_GZIP  # Cleared when the server rejects gzip bodies
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "X-API-Key": api_key or config.SILVERSTACK_API_KEY,
+        })
+
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def _adapt_batch_size(self, latency: float) -> None:
+        """Grow the batch size while the server is fast, halve it when it slows down."""
+        with self._lock:
+            if latency > config.DASHBOARD_TARGET_LATENCY:
+                self.batch_size = max(config.DASHBOARD_MIN_BATCH, self.batch_size // 2)
+            else:
+                self.batch_size = min(config.DASHBOARD_MAX_BATCH, self.batch_size + 10)
+
+    def _send(self, method: str, data: bytes, headers: dict) -> requests.Response:
+        start = time.monotonic()
+        resp = self.session.request(method, self.url, data=data, headers=headers, timeout=10)
+        metrics.observe("dashboard_request_seconds", time.monotonic() - start, method=method)
+        return resp
+
+    def _disable_gzip(self, status: int) -> None:
+        with self._lock:
+            if self.gzip:
+                print(f"[Dashboard] Server rejected a gzip body ({status}); sending uncompressed")
+            self.gzip = False
+
+    def _request(self, method: str, body) -> requests.Response:
+        """Send one JSON request, retrying transient failures.
+
+        Raises requests.RequestException once retries are exhausted.
+        """
+        raw = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        compressed = self.gzip
+        data, headers = (gzip.compress(raw), {"Content-Encoding": "gzip"}) if compressed else (raw, {})
+
+        metrics.observe("dashboard_request_bytes", len(data), method=method)
+        for attempt in range(config.DASHBOARD_MAX_RETRIES + 1):
+            start = time.monotonic()
+            wait = None
+            try:
+                resp = self._send(method, data, headers)
+                if compressed and resp.status_code in GZIP_REJECTED_STATUSES:
+                    self._disable_gzip(resp.status_code)
+                    compressed = False
+                    data, headers = raw, {}
+                    resp = self._send(method, data, headers)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    self._adapt_batch_size(time.monotonic() - start)
+                    return resp
+                wait = _retry_after(resp)
+                error = requests.HTTPError(f"{resp.status_code} from dashboard", response=resp)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            if attempt == config.DASHBOARD_MAX_RETRIES:
+                raise error
+            if wait is None:
+                # Full jitter: spreads concurrent retries out instead of syncing them up
+                wait = random.uniform(0, config.DASHBOARD_RETRY_BASE * 2 ** attempt)
+            with self._lock:
+                self.retries += 1
+            metrics.incr("dashboard_retries", method=method)
+            time.sleep(min(wait, config.DASHBOARD_RETRY_MAX_WAIT))
+
+    def _post_batch(self, batch: list[dict]) -> int:
+        """POST one batch of records and return how many the dashboard accepted."""
+        resp = self._request("POST", batch)
+        try:
+            return resp.json().get("accepted", len(batch))
+        except ValueError:
+            return len(batch)
+
+    def _delete_batch(self, source: str, urls: list[str]) -> int:
+        """Remove one batch of product URLs for a source and return how many were removed.
+
+        A non-retryable 4xx (e.g. 404/405 from a server without the DELETE
+        endpoint) marks removal as unsupported: this and every later batch
+        resolve to 0 without raising, so callers can forget the URLs instead
+        of retrying them forever.
+        """
+        if not self.removal_supported:
+            return 0
+        try:
+            self._request("DELETE", {"source": source, "urls": urls})
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            unsupported = status == 501 or (
+                status is not None and 400 <= status < 500
+                and status not in RETRY_STATUSES and status not in AUTH_STATUSES
+            )
+            if not unsupported:
+                raise
+            with self._lock:
+                if self.removal_supported:
+                    print(f"[Dashboard] Removals not supported by the server ({status}); skipping them")
+                self.removal_supported = False
+            return 0
+        return len(urls)
+
+    def submit_upload(self, batch: list[dict]) -> Future:
+        """Queue one batch for upload; the future resolves to the accepted count.
+
+        Blocks while max_concurrency batches are already in flight, so callers
+        carve their next batch (at the current batch_size) only once a slot
+        frees up, and unsent records never pile up in memory.
+        """
+        self._slots.acquire()
+        future = self._pool.submit(self._post_batch, batch)
+        future.add_done_callback(lambda _f: self._slots.release())
+        return future
+
+    def submit_remove(self, source: str, urls: list[str]) -> Future:
+        """Queue explicit removals for a source's vanished URLs; the future resolves to the removed count."""
+        self._slots.acquire()
+        future = self._pool.submit(self._delete_batch, source, urls)
+        future.add_done_callback(lambda _f: self._slots.release())
+        return future
+
+    def close(self) -> None:
+        """Wait for in-flight requests and release the worker threads."""
+        self._pool.shutdown(wait=True)
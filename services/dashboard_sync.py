@@ -1,50 +1,298 @@
+import hashlib
+import json
+import os
+import time
+
 import requests
 
 import config
+from services.dashboard_client import DashboardClient
+from services.enrichment import DetailEnricher
+
+# Appended to a stored fingerprint whose record went out without its detail
+# page data, so the product is enriched again next run (and only resent if
+# that brings new data)
+UNENRICHED = "~"
+
+STATE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "dashboard_state.json")
+
+# Loaded once per process; long-running processes persist it via save_state()
+_state: dict | None = None
+
+
+def _load_state(filepath: str = STATE_FILE) -> dict:
+    """Read the per-source fingerprints of what the dashboard last received."""
+    if not os.path.exists(filepath):
+        return {"sources": {}, "last_full_sync": {}}
+    try:
+        with open(filepath, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {"sources": {}, "last_full_sync": {}}
+    data.setdefault("sources", {})
+    data.setdefault("last_full_sync", {})
+    return data
+
+
+def _save_state(state: dict, filepath: str = STATE_FILE) -> None:
+    """Persist dashboard fingerprints (compact, one entry per product URL)."""
+    with open(filepath, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+
+
+def _get_state() -> dict:
+    """Return the in-memory fingerprint state, loading it from disk on first use."""
+    global _state
+    if _state is None:
+        _state = _load_state()
+    return _state
+
+
+def save_state() -> None:
+    """Write the in-memory fingerprint state to disk."""
+    _save_state(_get_state())
+
+
+def _payload(p: dict, source: str) -> dict:
+    """Build the dashboard record for one scraped product."""
+    return {
+        "title": p["name"],
+        "price_eur": p["total_price"],
+        "url": p["url"],
+        "source": source,
+        "image_url": None,
+    }
+
+
+def _fingerprint(record: dict) -> str:
+    """Short hash of the fields the dashboard actually stores."""
+    key = f"{record['title']}\x1f{record['price_eur']}\x1f{record['source']}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _full_sync_due(state: dict, source: str) -> bool:
+    """True if this source has not had a full resync within DASHBOARD_FULL_SYNC_HOURS."""
+    last = state["last_full_sync"].get(source, 0)
+    return time.time() - last >= config.DASHBOARD_FULL_SYNC_HOURS * 3600
+
+
+class StreamingSync:
+    """Consumer stage that turns a stream of scraped products into dashboard uploads.
+
+    Products are fingerprinted as they arrive; new and changed ones are
+    buffered and handed to the DashboardClient as soon as a batch fills up,
+    so uploads overlap with scraping. Once a source has been fully scraped,
+    finish_source() sends removals for whatever it no longer lists.
+
+    A full resync of every product happens when `full` is set, when
+    DASHBOARD_FULL_SYNC is enabled, or every DASHBOARD_FULL_SYNC_HOURS per source.
+
+    With an `enricher`, records pass through it before being batched; only
+    new and changed products, and those still missing their details, may
+    trigger a detail page fetch.
+    """
+
+    def __init__(self, full: bool = False, client: DashboardClient | None = None,
+                 enricher: DetailEnricher | None = None):
+        self.full = full or config.DASHBOARD_FULL_SYNC
+        self._owns_client = client is None
+        self.client = client or DashboardClient()
+        self.enricher = enricher
+        self.state = _get_state()
+        self.summary = {"sent": 0, "accepted": 0, "unchanged": 0, "removed": 0, "errors": []}
+
+        self._buffer = []
+        self._enriching = []  # (future of (record, complete), original record, retry)
+        self._settled = []    # (source, url) marked enriched without a resend
+        self._uploads = []   # (records, future)
+        self._removals = []  # (source, urls, future)
+        self._current = {}   # source -> {url: fingerprint} seen this run
+        self._changed = {}   # source -> new/changed count
+        self._unchanged = {}  # source -> unchanged count
+        self._full_sources = set()
+        self.finished = set()
 
+    def _is_full(self, source: str) -> bool:
+        if source not in self._current:
+            self._current[source] = {}
+            self._changed[source] = 0
+            self._unchanged[source] = 0
+            if self.full or _full_sync_due(self.state, source):
+                self._full_sources.add(source)
+        return source in self._full_sources
 
-def sync_deals(products: list[dict], source: str) -> dict:
-    """POST products to the SilverStack dashboard API in batches of 50.
+    def _flush(self) -> None:
+        if self._buffer:
+            self._uploads.append((self._buffer, self.client.submit_upload(self._buffer)))
+            self._buffer = []
 
-    Returns a summary dict: {sent: int, accepted: int, errors: list[str]}
+    def _buffer_record(self, record: dict) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.client.batch_size:
+            self._flush()
+
+    def _collect_enriched(self, wait: bool = False) -> None:
+        """Move finished enrichments (or all of them, with `wait`) into the upload buffer."""
+        pending = []
+        for item in self._enriching:
+            future, original, retry = item
+            if not (wait or future.done()):
+                pending.append(item)
+                continue
+            record, complete = future.result()
+            if not complete:
+                self._current[record["source"]][record["url"]] += UNENRICHED
+            if retry and record == original:
+                # Retried enrichment brought nothing new: the dashboard already has this
+                self._unchanged[record["source"]] += 1
+                self.summary["unchanged"] += 1
+                if complete:
+                    self._settled.append((record["source"], record["url"]))
+                continue
+            self._buffer_record(record)
+        self._enriching = pending
+
+    def add(self, product: dict, source: str) -> None:
+        """Queue one in-stock product for upload if the dashboard does not already have it."""
+        full = self._is_full(source)
+        record = _payload(product, source)
+        if record["url"] in self._current[source]:
+            return  # Listed twice (e.g. on two pages); the first one wins
+        fingerprint = _fingerprint(record)
+        self._current[source][record["url"]] = fingerprint
+
+        previous = self.state["sources"].get(source, {}).get(record["url"])
+        retry = bool(self.enricher) and previous == fingerprint + UNENRICHED
+        changed = previous != fingerprint and not retry
+        if not full and not changed and not retry:
+            self._unchanged[source] += 1
+            self.summary["unchanged"] += 1
+            return
+        if not retry:
+            self._changed[source] += 1
+
+        if self.enricher:
+            future = self.enricher.submit(record, fetch_allowed=changed or retry)
+            self._enriching.append((future, record, retry and not full))
+            self._collect_enriched()
+        else:
+            self._buffer_record(record)
+
+    def signature(self, source: str) -> str:
+        """Short hash of the source's in-stock set and prices seen so far this run."""
+        items = sorted((url, fp.rstrip(UNENRICHED)) for url, fp in self._current.get(source, {}).items())
+        return hashlib.sha1(repr(items).encode("utf-8")).hexdigest()[:16]
+
+    def finish_source(self, source: str) -> None:
+        """Mark a source as completely scraped and send removals for vanished products.
+
+        Only call this for sources that scraped successfully; an empty source
+        removes everything previously sent for it.
+        """
+        full = self._is_full(source)
+        current = self._current[source]
+        previous = self.state["sources"].get(source, {})
+        removed = [u for u in previous if u not in current]
+
+        mode = "full" if full else "delta"
+        print(f"[Dashboard] {source} ({mode}): {self._changed[source]} new/changed, "
+              f"{self._unchanged[source]} unchanged, {len(removed)} removed")
+
+        for i in range(0, len(removed), config.DASHBOARD_BATCH_SIZE):
+            urls = removed[i : i + config.DASHBOARD_BATCH_SIZE]
+            self._removals.append((source, urls, self.client.submit_remove(source, urls)))
+        self.finished.add(source)
+
+    def close(self, persist: bool = True) -> dict:
+        """Flush remaining uploads, wait for all requests and record fingerprints.
+
+        Fingerprints are written to disk unless `persist` is False, in which
+        case the caller is expected to call save_state() itself later.
+
+        Returns a summary dict:
+            {sent: int, accepted: int, unchanged: int, removed: int, errors: list[str]}
+        """
+        self._collect_enriched(wait=True)
+        self._flush()
+        if self._owns_client:
+            self.client.close()
+        summary = self.summary
+
+        # Fingerprints only advance for batches the dashboard confirmed,
+        # so anything that failed is retried on the next run.
+        synced = {source: dict(self.state["sources"].get(source, {})) for source in self._current}
+        failed_sources = set()
+
+        for n, (batch, future) in enumerate(self._uploads, start=1):
+            summary["sent"] += len(batch)
+            try:
+                accepted = future.result()
+            except requests.RequestException as e:
+                summary["errors"].append(str(e))
+                failed_sources.update(r["source"] for r in batch)
+                print(f"[Dashboard] Batch {n} failed: {e}")
+                continue
+            summary["accepted"] += accepted
+            for r in batch:
+                synced[r["source"]][r["url"]] = self._current[r["source"]][r["url"]]
+            print(f"[Dashboard] Batch {n}: sent {len(batch)}, accepted {accepted}")
+        for source, url in self._settled:
+            synced[source][url] = self._current[source][url]
+
+        # A failed removal keeps its URLs for the next run, but does not hold
+        # back the full-sync bookkeeping: the uploads alone decide that.
+        # If the server does not support removals at all, the URLs are dropped.
+        for source, urls, future in self._removals:
+            try:
+                removed = future.result()
+            except requests.RequestException as e:
+                summary["errors"].append(str(e))
+                print(f"[Dashboard] Removal batch for {source} failed: {e}")
+                continue
+            summary["removed"] += removed
+            for u in urls:
+                synced[source].pop(u, None)
+
+        now = time.time()
+        for source, fingerprints in synced.items():
+            self.state["sources"][source] = fingerprints
+            if source in self._full_sources and source in self.finished and source not in failed_sources:
+                self.state["last_full_sync"][source] = now
+        if persist:
+            save_state()
+
+        if self.client.retries:
+            print(f"[Dashboard] {self.client.retries} request(s) retried")
+        return summary
+
+
+def sync_all(products_by_source: dict[str, list[dict]], full: bool = False,
+             client: DashboardClient | None = None) -> dict:
+    """Sync several sources' complete in-stock lists to the SilverStack dashboard in one pass.
+
+    Only new and changed products are POSTed, and products that disappeared
+    since the last sync are sent as explicit removals (see StreamingSync).
+    Each list must be the complete in-stock set for its source.
+
+    Returns a summary dict:
+        {sent: int, accepted: int, unchanged: int, removed: int, errors: list[str]}
     """
     if not config.SILVERSTACK_URL or not config.SILVERSTACK_API_KEY:
         print("[Dashboard] Skipped (SILVERSTACK_URL or SILVERSTACK_API_KEY not set)")
-        return {"sent": 0, "accepted": 0, "errors": ["Missing dashboard config"]}
+        return {"sent": 0, "accepted": 0, "unchanged": 0, "removed": 0,
+                "errors": ["Missing dashboard config"]}
 
-    url = f"{config.SILVERSTACK_URL.rstrip('/')}/api/deals"
-    headers = {
-        "Content-Type": "application/json",
-        "X-API-Key": config.SILVERSTACK_API_KEY,
-    }
+    stream = StreamingSync(full=full, client=client)
+    for source, products in products_by_source.items():
+        for p in products:
+            stream.add(p, source)
+        stream.finish_source(source)
+    return stream.close()
 
-    summary = {"sent": 0, "accepted": 0, "errors": []}
-
-    # Process in batches of 50
-    for i in range(0, len(products), 50):
-        batch = products[i : i + 50]
-        payload = [
-            {
-                "title": p["name"],
-                "price_eur": p["total_price"],
-                "url": p["url"],
-                "source": source,
-                "image_url": None,
-            }
-            for p in batch
-        ]
-
-        try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            batch_accepted = data.get("accepted", len(batch))
-            summary["sent"] += len(batch)
-            summary["accepted"] += batch_accepted
-            print(f"[Dashboard] Batch {i // 50 + 1}: sent {len(batch)}, accepted {batch_accepted}")
-        except requests.RequestException as e:
-            summary["sent"] += len(batch)
-            summary["errors"].append(str(e))
-            print(f"[Dashboard] Batch {i // 50 + 1} failed: {e}")
 
-    return summary
+def sync_deals(products: list[dict], source: str, full: bool = False) -> dict:
+    """Sync a single source's in-stock products to the SilverStack dashboard.
+
+    See sync_all(); prefer that when syncing several sources at once.
+    """
+    return sync_all({source: products}, full=full)
@@ -1,36 +1,35 @@
 # LEGACY: Kept as fallback. Primary deal evaluation is now handled by SilverStack dashboard.
-import json
-import os
+from services.state_store import get_store
 
 
-DEAL_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "notified_deals.json")
-
-
-def load(filepath: str = DEAL_FILE) -> dict:
-    """Read notified deals from JSON file. Returns empty dict if missing."""
-    if not os.path.exists(filepath):
-        return {}
-    try:
-        with open(filepath, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
+def load() -> dict:
+    """Return all notified deals as {url: {price_per_oz, total_price}}."""
+    return get_store().all_deals()
 
 
 def is_already_notified(deals: dict, url: str, price_per_oz: float, total_price: float) -> bool:
-    """Return True if the same deal (URL + price) was already notified."""
-    if url not in deals:
-        return False
-    prev = deals[url]
-    return prev["price_per_oz"] == price_per_oz and prev["total_price"] == total_price
+    """Return True if the same deal (URL + price) was already notified.
+
+    `deals` is consulted first; URLs it does not contain are looked up in
+    the state store with a single indexed query.
+    """
+    if url in deals:
+        prev = deals[url]
+        return prev["price_per_oz"] == price_per_oz and prev["total_price"] == total_price
+    prev = get_store().get_deal(url)
+    return prev is not None and prev == (price_per_oz, total_price)
 
 
 def mark_notified(deals: dict, url: str, price_per_oz: float, total_price: float) -> None:
-    """Record a deal as notified (updates dict in-place)."""
+    """Record a deal as notified (updates dict in-place and writes the row through)."""
     deals[url] = {"price_per_oz": price_per_oz, "total_price": total_price}
+    get_store().upsert_deals({url: deals[url]})
+
 
+def save(deals: dict) -> None:
+    """Upsert every deal in the dict in one transaction.
 
-def save(deals: dict, filepath: str = DEAL_FILE) -> None:
-    """Write notified deals dict to JSON file."""
-    with open(filepath, "w") as f:
-        json.dump(deals, f, indent=2)
+    mark_notified() already writes through, so this is only needed for dicts
+    modified directly.
+    """
+    get_store().upsert_deals(deals)
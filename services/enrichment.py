@@ -0,0 +1,111 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import config
+from core import metrics
+from scrapers import fetch
+from scrapers.detail import extract_details
+from scrapers.spec import DealerSpec
+from services.state_store import get_store
+
+
+def _done(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class DetailEnricher:
+    """Adds detail-page data (image, weight, year, tier prices) to dashboard records.
+
+    Details are cached by URL in the state store. A record whose details are
+    younger than ENRICH_TTL_HOURS is served from the cache; otherwise the
+    detail page is fetched on a small pool (ENRICH_WORKERS) through the
+    per-host politeness limits, at most ENRICH_MAX_FETCHES times per run.
+    Callers only submit new or changed products, so unchanged ones are
+    never re-fetched.
+
+    A failing detail page is retried after ENRICH_RETRY_MINUTES, doubling
+    with each failure, and given up on after ENRICH_MAX_ATTEMPTS tries
+    until ENRICH_TTL_HOURS have passed since the last one.
+
+    submit() returns a future of (record, complete); complete is False when
+    the details could not be fetched this run but are worth retrying
+    (failed, backing off or over budget).
+    """
+
+    def __init__(self, specs: dict[str, DealerSpec], max_workers: int | None = None,
+                 max_fetches: int | None = None):
+        self.specs = specs
+        self.max_fetches = config.ENRICH_MAX_FETCHES if max_fetches is None else max_fetches
+        self.stats = {"cached": 0, "fetched": 0, "failed": 0, "deferred": 0, "abandoned": 0}
+        self._fetches = 0  # Detail fetches started this run
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or config.ENRICH_WORKERS)
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+        metrics.incr("enrichment", outcome=outcome)
+
+    def _fetch(self, record: dict, spec: DealerSpec, failures: int) -> tuple[dict, bool]:
+        try:
+            with metrics.timer("enrich_fetch_seconds", dealer=record["source"]):
+                resp = fetch.get(record["url"])
+                resp.raise_for_status()
+            details = extract_details(spec, resp.text)
+        except Exception as e:
+            # Network or parse error alike: a bad detail page must never abort the run
+            print(f"[Enrich] {record['url']}: {e}")
+            failures += 1
+            get_store().set_detail_failure(record["url"], failures, time.time())
+            self._count("failed")
+            return record, failures >= config.ENRICH_MAX_ATTEMPTS
+        get_store().set_details(record["url"], details, time.time())
+        self._count("fetched")
+        return {**record, **details}, True
+
+    def submit(self, record: dict, fetch_allowed: bool = True) -> Future:
+        """Enrich one dashboard record.
+
+        With fetch_allowed=False (e.g. an unchanged product resent by a full
+        sync) only cached details are used, however old.
+        """
+        spec = self.specs.get(record["source"])
+        cached = get_store().get_details(record["url"])
+        if cached is not None:
+            fetched_at, details = cached
+            fresh = time.time() - fetched_at < config.ENRICH_TTL_HOURS * 3600
+            if fresh or not fetch_allowed or spec is None:
+                self._count("cached")
+                return _done(({**record, **details}, True))
+        if not fetch_allowed or spec is None:
+            return _done((record, True))
+
+        failures = 0
+        failure = get_store().get_detail_failure(record["url"])
+        if failure is not None:
+            failures, failed_at = failure
+            age = time.time() - failed_at
+            if age >= config.ENRICH_TTL_HOURS * 3600:
+                failures = 0  # Long enough ago: start over
+            elif failures >= config.ENRICH_MAX_ATTEMPTS:
+                self._count("abandoned")
+                return _done((record, True))
+            elif age < config.ENRICH_RETRY_MINUTES * 60 * 2 ** (failures - 1):
+                self._count("deferred")
+                return _done((record, False))
+
+        with self._lock:
+            over_budget = self._fetches >= self.max_fetches
+            if not over_budget:
+                self._fetches += 1
+        if over_budget:
+            self._count("deferred")
+            return _done((record, False))
+        return self._pool.submit(self._fetch, record, spec, failures)
+
+    def close(self) -> None:
+        """Wait for in-flight detail fetches."""
+        self._pool.shutdown(wait=True)
@@ -1,31 +1,78 @@
+import hashlib
 import json
 import os
+import time
 
 import requests
 
 import config
+from services.state_store import get_store
 
-STATE_FILES = ["api_usage.json", "spot_price_cache.json", "notified_deals.json"]
+STATE_FILES = ["api_usage.json", "spot_price_cache.json", "notified_deals.json", "best_offers.json"]
+
+_session = requests.Session()
+
+
+def _compact(filename: str) -> str | None:
+    """Read a state file and re-serialize it without whitespace. None if unreadable."""
+    try:
+        with open(filename, "r") as f:
+            return json.dumps(json.load(f), separators=(",", ":"))
+    except (json.JSONDecodeError, IOError):
+        return None
+
+
+def _digest(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def _rate_limited_until(resp: requests.Response) -> float | None:
+    """Return the epoch time GitHub asks us to wait until, if the response says so."""
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return time.time() + int(retry_after)
+    if resp.headers.get("X-RateLimit-Remaining") == "0":
+        reset = resp.headers.get("X-RateLimit-Reset", "")
+        if reset.isdigit():
+            return float(reset)
+    return None
 
 
 def sync_state_to_gist():
-    """Upload state files to a GitHub Gist for the Telegram bot worker to read."""
+    """Upload changed state files to a GitHub Gist for the Telegram bot worker to read.
+
+    A content hash per file is kept in the state store; files identical to
+    the last successful upload are left out, and the API call is skipped
+    when nothing changed or while GitHub's rate limit is exhausted.
+    """
     if not config.GITHUB_TOKEN or not config.GIST_ID:
         print("[Gist Sync] Skipped (GITHUB_TOKEN or GIST_ID not set)")
         return
 
-    files = {}
+    store = get_store()
+    blocked_until = float(store.get_meta("gist_blocked_until") or 0)
+    if blocked_until > time.time():
+        print(f"[Gist Sync] Skipped (rate limited for {blocked_until - time.time():.0f}s)")
+        return
+
+    files, hashes = {}, {}
     for filename in STATE_FILES:
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                files[filename] = {"content": f.read()}
+        if not os.path.exists(filename):
+            continue
+        content = _compact(filename)
+        if content is None:
+            continue
+        digest = _digest(content)
+        if store.get_meta(f"gist_hash:{filename}") != digest:
+            files[filename] = {"content": content}
+            hashes[filename] = digest
 
     if not files:
-        print("[Gist Sync] No state files to sync")
+        print("[Gist Sync] No changes to sync")
         return
 
     try:
-        resp = requests.patch(
+        resp = _session.patch(
             f"https://api.github.com/gists/{config.GIST_ID}",
             headers={
                 "Authorization": f"token {config.GITHUB_TOKEN}",
@@ -34,7 +81,12 @@ def sync_state_to_gist():
             json={"files": files},
             timeout=10,
         )
+        wait_until = _rate_limited_until(resp)
+        if wait_until:
+            store.set_meta("gist_blocked_until", str(wait_until))
         resp.raise_for_status()
-        print(f"[Gist Sync] Uploaded {len(files)} state file(s)")
+        for filename, digest in hashes.items():
+            store.set_meta(f"gist_hash:{filename}", digest)
+        print(f"[Gist Sync] Uploaded {len(files)} changed state file(s)")
     except Exception as e:
         print(f"[Gist Sync] Failed: {e}")
@@ -0,0 +1,120 @@
+import time
+
+import config
+from services.state_store import get_store
+
+# Latency samples kept per dealer (one per successful scrape: its slowest page)
+LATENCY_SAMPLES = 50
+# Timeouts are only derived once a dealer has this many samples
+MIN_LATENCY_SAMPLES = 5
+
+
+def _new_source() -> dict:
+    return {
+        "success_streak": 0,
+        "failure_streak": 0,
+        "successes": 0,
+        "failures": 0,
+        "opened": 0,            # Consecutive times the breaker opened (drives the cool-down)
+        "open_until": 0.0,      # Epoch seconds; the dealer is skipped until then
+        "latencies": [],        # Slowest page fetch per successful scrape, seconds
+        "durations": [],        # Whole-dealer scrape time per successful scrape, seconds
+        "products": 0,          # In-stock products at the last successful scrape
+    }
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class DealerHealth:
+    """Per-dealer success/failure streaks, latency history and circuit breaker.
+
+    After HEALTH_FAILURE_THRESHOLD consecutive failures a dealer's breaker
+    opens and it is skipped for HEALTH_COOLDOWN_MINUTES, doubling with each
+    consecutive re-open up to HEALTH_MAX_COOLDOWN_HOURS. Once the cool-down
+    has passed one trial scrape is allowed; a success closes the breaker.
+    Request timeouts are derived from each dealer's own p95 latency.
+    Records are kept in the state store.
+    """
+
+    def __init__(self, source_ids: list[str]):
+        self.sources = get_store().load_health()
+        for source_id in source_ids:
+            self.sources.setdefault(source_id, _new_source())
+
+    def _get(self, source_id: str) -> dict:
+        return self.sources.setdefault(source_id, _new_source())
+
+    def allow(self, source_id: str, now: float | None = None) -> bool:
+        """True unless the dealer's breaker is open."""
+        return self._get(source_id)["open_until"] <= (now or time.time())
+
+    def record_success(self, source_id: str, duration: float, products: int,
+                       max_latency: float | None = None) -> None:
+        """Record a completed scrape; closes the breaker."""
+        s = self._get(source_id)
+        s["successes"] += 1
+        s["success_streak"] += 1
+        s["failure_streak"] = 0
+        s["opened"] = 0
+        s["open_until"] = 0.0
+        s["products"] = products
+        s["durations"] = (s["durations"] + [round(duration, 3)])[-LATENCY_SAMPLES:]
+        if max_latency is not None:
+            s["latencies"] = (s["latencies"] + [round(max_latency, 3)])[-LATENCY_SAMPLES:]
+
+    def record_failure(self, source_id: str, now: float | None = None) -> None:
+        """Record a failed scrape; opens the breaker once failures keep coming."""
+        now = now or time.time()
+        s = self._get(source_id)
+        s["failures"] += 1
+        s["failure_streak"] += 1
+        s["success_streak"] = 0
+        if s["failure_streak"] >= config.HEALTH_FAILURE_THRESHOLD:
+            cooldown = min(
+                config.HEALTH_COOLDOWN_MINUTES * 60 * 2 ** s["opened"],
+                config.HEALTH_MAX_COOLDOWN_HOURS * 3600,
+            )
+            s["opened"] += 1
+            s["open_until"] = now + cooldown
+            print(f"[Health] {source_id}: {s['failure_streak']} failures in a row, "
+                  f"skipping for {cooldown / 60:.0f} min")
+
+    def timeout(self, source_id: str) -> float:
+        """Request timeout for a dealer: its p95 latency times HEALTH_TIMEOUT_FACTOR, clamped."""
+        latencies = self._get(source_id)["latencies"]
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return config.REQUEST_TIMEOUT
+        derived = _percentile(latencies, 95) * config.HEALTH_TIMEOUT_FACTOR
+        return max(config.HEALTH_MIN_TIMEOUT, min(config.REQUEST_TIMEOUT, derived))
+
+    def expected_duration(self, source_id: str) -> float:
+        """Typical (median) whole-dealer scrape time; REQUEST_TIMEOUT if unknown."""
+        durations = self._get(source_id)["durations"]
+        return _percentile(durations, 50) if durations else float(config.REQUEST_TIMEOUT)
+
+    def expected_value(self, source_id: str) -> float:
+        """Products we expect per second spent, discounted by the dealer's success rate."""
+        s = self._get(source_id)
+        attempts = s["successes"] + s["failures"]
+        success_rate = s["successes"] / attempts if attempts else 1.0
+        return max(s["products"], 1) * success_rate / max(self.expected_duration(source_id), 0.1)
+
+    def prioritize(self, source_ids: list[str]) -> list[str]:
+        """Order dealers by expected value, best first."""
+        return sorted(source_ids, key=self.expected_value, reverse=True)
+
+    def describe(self, source_id: str) -> str:
+        """One-line health summary for the run log."""
+        s = self._get(source_id)
+        state = "open" if not self.allow(source_id) else "closed"
+        latency = f"p95 {_percentile(s['latencies'], 95):.1f}s" if s["latencies"] else "no latency data"
+        return (f"{source_id}: breaker {state}, {s['success_streak']} ok / "
+                f"{s['failure_streak']} failed in a row, {latency}, timeout {self.timeout(source_id):.0f}s")
+
+    def save(self) -> None:
+        """Persist health records."""
+        get_store().save_health(self.sources)
@@ -1,41 +1,209 @@
 # LEGACY: Kept as fallback. Primary deal evaluation is now handled by SilverStack dashboard.
+import html
+import queue
+import threading
+import time
+
 import requests
+
 import config
+from core import metrics
+from services import deal_tracker
+from services.rate_limiter import RateLimiter
 
 
 class TelegramNotifier:
-    """Sends messages to a Telegram chat via the Bot API."""
+    """Sends messages to a Telegram chat via the Bot API over one keep-alive session.
 
-    API_URL = "https://api.telegram.org/bot{token}/sendMessage"
+    `api_base` defaults to TELEGRAM_API_BASE, so tests can point it at a
+    local stub Bot API.
+    """
 
-    def __init__(self):
-        self.token = config.TELEGRAM_BOT_TOKEN
-        self.chat_id = config.TELEGRAM_CHAT_ID
-
-    def send(self, message: str) -> bool:
-        """Send a text message to the configured Telegram chat.
+    def __init__(self, token: str | None = None, chat_id: str | None = None,
+                 api_base: str | None = None):
+        self.token = token or config.TELEGRAM_BOT_TOKEN
+        self.chat_id = chat_id or config.TELEGRAM_CHAT_ID
+        self.api_url = f"{(api_base or config.TELEGRAM_API_BASE).rstrip('/')}/bot{self.token}/sendMessage"
+        self.session = requests.Session()
 
-        Returns True on success, False on failure.
-        """
-        url = self.API_URL.format(token=self.token)
+    def try_send(self, message: str) -> tuple[bool, float | None]:
+        """Send once; return (ok, retry_after) where retry_after is set on a 429."""
         payload = {
             "chat_id": self.chat_id,
             "text": message,
             "parse_mode": "HTML",
         }
-
         try:
-            resp = requests.post(url, json=payload, timeout=10)
-            resp.raise_for_status()
+            resp = self.session.post(self.api_url, json=payload, timeout=10)
             data = resp.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"[Telegram] Failed to send message: {e}")
+            return False, None
+
+        if resp.status_code == 429:
+            return False, float(data.get("parameters", {}).get("retry_after", 1))
+        if not resp.ok or not data.get("ok"):
+            print(f"[Telegram] API returned not ok: {data}")
+            return False, None
+        return True, None
+
+    def send(self, message: str) -> bool:
+        """Send a text message to the configured Telegram chat (blocking).
+
+        Returns True on success, False on failure.
+        """
+        ok, _retry_after = self.try_send(message)
+        if ok:
+            print("[Telegram] Message sent successfully.")
+        return ok
+
+
+EVENT_LABELS = {"restock": "Back in stock", "price_drop": "Price drop"}
 
-            if not data.get("ok"):
-                print(f"[Telegram] API returned not ok: {data}")
+
+def format_digest(deals: list[dict]) -> str:
+    """One HTML message listing several deals, cheapest per ounce first."""
+    lines = [f"<b>{len(deals)} new deal(s)</b>"]
+    for d in sorted(deals, key=lambda d: d["price_per_oz"]):
+        name = html.escape(d.get("name", d["url"]))
+        url = html.escape(d["url"], quote=True)
+        source = f" · {html.escape(d['source'])}" if d.get("source") else ""
+        label = f"{EVENT_LABELS[d['event']]}: " if d.get("event") in EVENT_LABELS else ""
+        was = f", was EUR {d['previous_price_per_oz']:.2f}/oz" if d.get("previous_price_per_oz") else ""
+        lines.append(
+            f"• {label}<a href=\"{url}\">{name}</a>\n"
+            f"  EUR {d['price_per_oz']:.2f}/oz (EUR {d['total_price']:.2f}){was}{source}"
+        )
+        cheaper = d.get("cheaper_at")
+        if cheaper:
+            cheaper_url = html.escape(cheaper["url"], quote=True)
+            lines.append(
+                f"  Cheaper at <a href=\"{cheaper_url}\">{html.escape(cheaper['source'])}</a>: "
+                f"EUR {cheaper['price_per_oz']:.2f}/oz"
+            )
+    return "\n".join(lines)
+
+
+# Shared by every queue in the process, so several chats stay under the global limit
+_global_limiter = RateLimiter(rate=config.TELEGRAM_GLOBAL_RATE, capacity=config.TELEGRAM_GLOBAL_RATE)
+
+
+class AlertQueue:
+    """Non-blocking deal alerts, coalesced into digests and drained by a background thread.
+
+    put() only enqueues. The worker waits ALERT_COALESCE_SECONDS after the
+    first deal to gather the rest of the burst, sends them as digests of at
+    most ALERT_MAX_ITEMS, paces messages per chat and globally with token
+    buckets, and honors Telegram's retry_after on 429. Deals are marked as
+    notified only once their digest was delivered, and deals already
+    notified at the same price are skipped.
+    """
+
+    def __init__(self, notifier: TelegramNotifier | None = None, window: float | None = None):
+        self.notifier = notifier or TelegramNotifier()
+        self.window = config.ALERT_COALESCE_SECONDS if window is None else window
+        self.chat_limiter = RateLimiter(rate=config.TELEGRAM_CHAT_RATE, capacity=1.0)
+        self.stats = {"queued": 0, "sent_messages": 0, "sent_deals": 0, "dropped": 0, "retries": 0}
+
+        self._queue: queue.Queue = queue.Queue()
+        self._queued_urls: set[str] = set()
+        self._lock = threading.Lock()
+        self._flush = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telegram-alerts", daemon=True)
+        self._thread.start()
+
+    def put(self, deal: dict, dedupe: bool = True) -> bool:
+        """Queue a deal (url, name, price_per_oz, total_price, optional source/event).
+
+        Returns False if it is already queued or, with `dedupe`, was already
+        notified at this price. Pass dedupe=False for events that are new by
+        construction, such as a restock at an earlier price.
+        """
+        with self._lock:
+            if deal["url"] in self._queued_urls or (dedupe and deal_tracker.is_already_notified(
+                    {}, deal["url"], deal["price_per_oz"], deal["total_price"])):
                 return False
+            self._queued_urls.add(deal["url"])
+            self.stats["queued"] += 1
+        self._queue.put(deal)
+        return True
 
-            print(f"[Telegram] Message sent successfully.")
-            return True
+    def _collect(self, first) -> tuple[list[dict], bool]:
+        """Gather everything queued within the coalescing window after `first`."""
+        deals, stop = [first], False
+        deadline = time.monotonic() + self.window
+        while True:
+            remaining = deadline - time.monotonic()
+            if self._flush.is_set():
+                remaining = 0
+            try:
+                item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return deals, stop
+            if item is None:
+                stop = True
+            else:
+                deals.append(item)
 
-        except requests.RequestException as e:
-            print(f"[Telegram] Failed to send message: {e}")
-            return False
+    def _deliver(self, message: str) -> bool:
+        """Send one message within the rate limits, retrying 429s and network errors."""
+        for attempt in range(config.TELEGRAM_MAX_RETRIES + 1):
+            self.chat_limiter.acquire(self.notifier.chat_id)
+            _global_limiter.acquire("global")
+            ok, retry_after = self.notifier.try_send(message)
+            if ok:
+                return True
+            if attempt < config.TELEGRAM_MAX_RETRIES:
+                with self._lock:
+                    self.stats["retries"] += 1
+                time.sleep(retry_after if retry_after is not None else 2 ** attempt)
+        return False
+
+    def _send(self, deals: list[dict]) -> None:
+        for i in range(0, len(deals), config.ALERT_MAX_ITEMS):
+            chunk = deals[i : i + config.ALERT_MAX_ITEMS]
+            delivered = self._deliver(format_digest(chunk))
+            with self._lock:
+                for d in chunk:
+                    self._queued_urls.discard(d["url"])
+                if delivered:
+                    self.stats["sent_messages"] += 1
+                    self.stats["sent_deals"] += len(chunk)
+                else:
+                    self.stats["dropped"] += len(chunk)
+            if delivered:
+                sent_at = time.time()
+                for d in chunk:
+                    deal_tracker.mark_notified({}, d["url"], d["price_per_oz"], d["total_price"])
+                    if "scraped_at" in d:
+                        metrics.observe("alert_latency_seconds", sent_at - d["scraped_at"],
+                                        event=d.get("event", "deal"))
+                print(f"[Telegram] Digest with {len(chunk)} deal(s) sent")
+            else:
+                print(f"[Telegram] Gave up on a digest with {len(chunk)} deal(s)")
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            deals, stop = self._collect(first)
+            self._send(deals)
+            if self._queue.empty():
+                self._flush.clear()
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Send whatever is queued now, skipping the rest of the coalescing window."""
+        self._flush.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queued_urls and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.05)
+        if not self._queued_urls:
+            self._flush.clear()
+
+    def close(self, timeout: float | None = None) -> None:
+        """Deliver everything still queued, then stop the worker thread."""
+        self._flush.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
@@ -0,0 +1,190 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+import config
+from services.state_store import get_store
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Named windows for rolling statistics
+WINDOWS = {"24h": DAY, "7d": 7 * DAY, "30d": 30 * DAY}
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of an already sorted list."""
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+class Series:
+    """One product's price observations as packed, time-ordered columns.
+
+    Timestamps are unsigned 32-bit epoch seconds and prices 32-bit floats,
+    12 bytes per observation.
+    """
+
+    __slots__ = ("ts", "total", "ppo")
+
+    def __init__(self, ts: bytes = b"", total: bytes = b"", ppo: bytes = b""):
+        self.ts = array("I", ts)
+        self.total = array("f", total)
+        self.ppo = array("f", ppo)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def append(self, ts: int, total_price: float, price_per_oz: float) -> None:
+        self.ts.append(ts)
+        self.total.append(total_price)
+        self.ppo.append(price_per_oz)
+
+    def since(self, start: float) -> int:
+        """Index of the first observation at or after `start`."""
+        return bisect_left(self.ts, int(start))
+
+    def compact(self, now: float) -> bool:
+        """Apply the retention policy; return True if anything was dropped.
+
+        Observations younger than HISTORY_RAW_HOURS are kept as-is, up to
+        HISTORY_HOURLY_DAYS one per hour is kept, then one per day until
+        HISTORY_RETENTION_DAYS, after which they are dropped. The last
+        observation of each bucket is the one kept.
+        """
+        raw_from = now - config.HISTORY_RAW_HOURS * HOUR
+        hourly_from = now - config.HISTORY_HOURLY_DAYS * DAY
+        oldest = now - config.HISTORY_RETENTION_DAYS * DAY
+
+        keep = []
+        for i in range(self.since(oldest), len(self.ts)):
+            ts = self.ts[i]
+            if ts >= raw_from:
+                keep.append(i)
+                continue
+            bucket = HOUR if ts >= hourly_from else DAY
+            nxt = self.ts[i + 1] if i + 1 < len(self.ts) else None
+            if nxt is None or nxt // bucket != ts // bucket or nxt >= raw_from:
+                keep.append(i)
+
+        if len(keep) == len(self.ts):
+            return False
+        self.ts = array("I", (self.ts[i] for i in keep))
+        self.total = array("f", (self.total[i] for i in keep))
+        self.ppo = array("f", (self.ppo[i] for i in keep))
+        return True
+
+
+class PriceHistory:
+    """Append-only price history per (source_id, url), persisted in the state store.
+
+    Series are loaded lazily on first access and appended in O(1). save()
+    compacts every series and writes back only those that changed.
+    Window queries bisect the sorted timestamp column and sort just the
+    matching slice.
+    """
+
+    def __init__(self):
+        self._series: dict[tuple[str, str], Series] | None = None
+        self._dirty: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def _get_series(self) -> dict[tuple[str, str], Series]:
+        """Return all series, loading them on first use. Caller must hold _lock."""
+        if self._series is None:
+            self._series = {
+                (source_id, url): Series(ts, total, ppo)
+                for source_id, url, ts, total, ppo in get_store().load_price_series()
+            }
+        return self._series
+
+    def append(self, source_id: str, url: str, total_price: float, price_per_oz: float,
+               ts: float | None = None) -> None:
+        """Record one observation of a product's price."""
+        ts = int(ts or time.time())
+        key = (source_id, url)
+        with self._lock:
+            series = self._get_series().setdefault(key, Series())
+            # Clock skew or a replayed run must not break the sorted order
+            if series.ts and ts < series.ts[-1]:
+                return
+            series.append(ts, total_price, price_per_oz)
+            self._dirty.add(key)
+
+    def stats(self, source_id: str, url: str, window: str | float = "7d",
+              now: float | None = None) -> dict | None:
+        """Rolling price_per_oz statistics for a product over a window.
+
+        `window` is a key of WINDOWS or a number of seconds. Returns
+        {count, min, median, p10, p90, last} or None without observations.
+        """
+        seconds = WINDOWS[window] if isinstance(window, str) else window
+        now = now or time.time()
+        with self._lock:
+            series = self._get_series().get((source_id, url))
+            if not series:
+                return None
+            values = sorted(series.ppo[series.since(now - seconds):])
+            last = series.ppo[-1]
+        if not values:
+            return None
+        return {
+            "count": len(values),
+            "min": round(values[0], 2),
+            "median": round(_percentile(values, 50), 2),
+            "p10": round(_percentile(values, 10), 2),
+            "p90": round(_percentile(values, 90), 2),
+            "last": round(last, 2),
+        }
+
+    def percentile(self, source_id: str, url: str, q: float, window: str | float = "30d",
+                   now: float | None = None) -> float | None:
+        """The q-th percentile (0..100) of price_per_oz over a window, or None."""
+        seconds = WINDOWS[window] if isinstance(window, str) else window
+        now = now or time.time()
+        with self._lock:
+            series = self._get_series().get((source_id, url))
+            if not series:
+                return None
+            values = sorted(series.ppo[series.since(now - seconds):])
+        return round(_percentile(values, q), 2) if values else None
+
+    def save(self, now: float | None = None) -> None:
+        """Apply retention to every series and persist the ones that changed.
+
+        Series of products no longer listed are compacted too, and dropped
+        from the store once all their observations are past HISTORY_RETENTION_DAYS.
+        """
+        now = now or time.time()
+        with self._lock:
+            series = self._get_series()
+            rows, expired = [], []
+            for key, s in list(series.items()):
+                if not s.compact(now) and key not in self._dirty:
+                    continue
+                if not s:
+                    del series[key]
+                    expired.append(key)
+                    continue
+                rows.append((*key, s.ts.tobytes(), s.total.tobytes(), s.ppo.tobytes()))
+            self._dirty.clear()
+        store = get_store()
+        store.save_price_series(rows)
+        if expired:
+            store.delete_price_series(expired)
+
+
+_history: PriceHistory | None = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> PriceHistory:
+    """Return the process-wide price history."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = PriceHistory()
+        return _history
@@ -1,25 +1,101 @@
-# LEGACY: Kept as fallback. Primary deal evaluation is now handled by SilverStack dashboard.
-import json
-import os
+# Token buckets for dealer hosts and API keys, plus monthly API quota accounting.
+import asyncio
+import threading
+import time
 from datetime import datetime
 
 import config
+from services.state_store import get_store
 
-USAGE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "api_usage.json")
 
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`.
 
-def _load_usage() -> dict:
-    """Load the usage tracker from disk."""
-    if not os.path.exists(USAGE_FILE):
-        return {}
-    with open(USAGE_FILE, "r") as f:
-        return json.load(f)
+    reserve() never sleeps. It takes the tokens immediately (letting the
+    balance go negative, which queues later callers behind this one) and
+    returns how long the caller must wait before proceeding.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens: float = 1.0, now: float | None = None) -> float:
+        """Seconds until `tokens` would be available, without taking them."""
+        self._refill(now or time.monotonic())
+        return max(0.0, (tokens - self.tokens) / self.rate)
 
+    def reserve(self, tokens: float = 1.0, now: float | None = None) -> float:
+        """Take `tokens` and return the seconds to wait before using them."""
+        wait = self.wait_time(tokens, now)
+        self.tokens -= tokens
+        return wait
+
+
+class RateLimiter:
+    """Thread-safe registry of token buckets, one per key (a host, an API key...).
+
+    The lock is only held for the bucket arithmetic, never while sleeping,
+    so threads and asyncio tasks can share one limiter.
+    """
 
-def _save_usage(data: dict) -> None:
-    """Persist the usage tracker to disk."""
-    with open(USAGE_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.waited = 0.0  # Seconds callers were told to wait since the last reset_stats()
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+        return bucket
+
+    def wait_time(self, key: str, tokens: float = 1.0) -> float:
+        """Seconds until `key` could proceed, without reserving anything."""
+        with self._lock:
+            return self._bucket(key).wait_time(tokens)
+
+    def reserve(self, key: str, tokens: float = 1.0) -> float:
+        """Reserve a slot for `key` and return the seconds to wait before using it."""
+        with self._lock:
+            wait = self._bucket(key).reserve(tokens)
+            self.waited += wait
+            return wait
+
+    def reset_stats(self) -> None:
+        """Zero the waited counter (start of a run or daemon cycle)."""
+        with self._lock:
+            self.waited = 0.0
+
+    def acquire(self, key: str, tokens: float = 1.0) -> float:
+        """Reserve a slot and sleep until it comes up. Returns the seconds waited."""
+        wait = self.reserve(key, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, key: str, tokens: float = 1.0) -> float:
+        """asyncio form of acquire()."""
+        wait = self.reserve(key, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+# Dealer politeness: one request start per HOST_REQUEST_INTERVAL per host
+host_limiter = RateLimiter(rate=1 / config.HOST_REQUEST_INTERVAL, capacity=config.HOST_REQUEST_BURST)
+# Short-term pacing per spot price API key, on top of the monthly quota
+api_key_limiter = RateLimiter(rate=1 / config.REQUEST_DELAY, capacity=1.0)
 
 
 def _current_month_key() -> str:
@@ -32,42 +108,72 @@ def _key_id(api_key: str) -> str:
     return api_key[-6:]
 
 
-def _get_key_usage(data: dict, month: str) -> dict:
-    """Return the per-key usage dict for the current month."""
-    if data.get("month") != month:
-        return {}
-    return data.get("keys", {})
+class MonthlyQuota:
+    """In-memory monthly request counters per API key, flushed to the state store in batches.
+
+    Counts are loaded once per month and then updated in memory; pending
+    increments are written every QUOTA_FLUSH_EVERY requests and on flush().
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._month: str | None = None
+        self._used: dict[str, int] = {}
+        self._pending: dict[str, int] = {}
+
+    def _sync_month(self) -> None:
+        """Load counters on first use and on month rollover. Caller must hold _lock."""
+        month = _current_month_key()
+        if month == self._month:
+            return
+        self._flush_locked()
+        self._month = month
+        self._used = get_store().get_usage(month)
+
+    def _flush_locked(self) -> None:
+        if self._pending and self._month:
+            get_store().increment_usage(self._month, self._pending)
+            self._pending = {}
+
+    def used(self, key_id: str) -> int:
+        with self._lock:
+            self._sync_month()
+            return self._used.get(key_id, 0)
+
+    def remaining(self, key_ids: list[str]) -> int:
+        with self._lock:
+            self._sync_month()
+            return max(0, self.limit * len(key_ids) - sum(self._used.get(k, 0) for k in key_ids))
+
+    def record(self, key_id: str, amount: int = 1) -> None:
+        with self._lock:
+            self._sync_month()
+            self._used[key_id] = self._used.get(key_id, 0) + amount
+            self._pending[key_id] = self._pending.get(key_id, 0) + amount
+            if sum(self._pending.values()) >= config.QUOTA_FLUSH_EVERY:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """Write pending increments to the state store."""
+        with self._lock:
+            self._flush_locked()
+
+
+quota = MonthlyQuota(config.MONTHLY_API_LIMIT)
 
 
 def get_available_key(keys: list[str]) -> str | None:
     """Return the first key with remaining requests, or None if all exhausted."""
-    data = _load_usage()
-    month = _current_month_key()
-    key_usage = _get_key_usage(data, month)
-
     for key in keys:
-        kid = _key_id(key)
-        used = key_usage.get(kid, 0)
-        if used < config.MONTHLY_API_LIMIT:
+        if quota.used(_key_id(key)) < config.MONTHLY_API_LIMIT:
             return key
     return None
 
 
 def get_remaining_requests() -> int:
     """Return total remaining API requests across all keys this month."""
-    data = _load_usage()
-    month = _current_month_key()
-    keys = config.SILVER_API_KEYS
-
-    if not keys:
-        return 0
-
-    if data.get("month") != month:
-        return config.MONTHLY_API_LIMIT * len(keys)
-
-    key_usage = data.get("keys", {})
-    total_used = sum(key_usage.get(_key_id(k), 0) for k in keys)
-    return max(0, config.MONTHLY_API_LIMIT * len(keys) - total_used)
+    return quota.remaining([_key_id(k) for k in config.SILVER_API_KEYS])
 
 
 def get_total_limit() -> int:
@@ -83,17 +189,11 @@ def can_make_request() -> bool:
 def record_request(api_key: str) -> None:
     """Record that one API request was used for a specific key.
 
-    Automatically resets the counter if a new month has started.
+    Counters are kept per month, so a new month starts from zero automatically.
     """
-    data = _load_usage()
-    month = _current_month_key()
-    kid = _key_id(api_key)
-
-    if data.get("month") != month:
-        # New month — reset all counters
-        data = {"month": month, "keys": {kid: 1}}
-    else:
-        keys = data.setdefault("keys", {})
-        keys[kid] = keys.get(kid, 0) + 1
-
-    _save_usage(data)
+    quota.record(_key_id(api_key))
+
+
+def flush() -> None:
+    """Persist pending quota counters (call before exporting state)."""
+    quota.flush()
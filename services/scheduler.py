@@ -0,0 +1,118 @@
+import json
+import os
+import time
+
+import config
+
+STATE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schedule_state.json")
+
+# Hours need this many observations before their own change rate is trusted
+MIN_HOUR_SAMPLES = 10
+
+
+def _load_state(filepath: str = STATE_FILE) -> dict:
+    """Read per-source polling statistics. Returns empty dict if missing or corrupt."""
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        with open(filepath, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def _new_source() -> dict:
+    return {
+        "rate": 0.5,             # EWMA of "changed since the previous poll" (0..1)
+        "signature": None,       # In-stock set + prices at the previous poll
+        "next_due": 0.0,
+        "interval": config.POLL_MAX_MINUTES * 60,
+        "hour_polls": [0] * 24,
+        "hour_changes": [0] * 24,
+    }
+
+
+class AdaptivePoller:
+    """Per-dealer polling intervals driven by how often each dealer actually changes.
+
+    After every poll the source's in-stock signature is compared to the
+    previous one. An exponentially weighted change rate then places the next
+    interval between POLL_MIN_MINUTES (always changing) and POLL_MAX_MINUTES
+    (never changing). Hours of the day with a history of above-average change,
+    or listed in POLL_BUSY_HOURS, poll POLL_BUSY_BOOST times more often.
+    """
+
+    def __init__(self, source_ids: list[str], filepath: str = STATE_FILE):
+        self.filepath = filepath
+        self.known = set(source_ids)
+        # Dealers dropped from the scraper list would otherwise stay due forever
+        loaded = _load_state(filepath)
+        self.sources = {source_id: loaded.get(source_id) or _new_source() for source_id in source_ids}
+
+    def _is_busy_hour(self, s: dict, hour: int) -> bool:
+        if hour in config.POLL_BUSY_HOURS:
+            return True
+        polls = s["hour_polls"][hour]
+        total_polls = sum(s["hour_polls"])
+        if polls < MIN_HOUR_SAMPLES or not total_polls:
+            return False
+        hour_rate = s["hour_changes"][hour] / polls
+        overall_rate = sum(s["hour_changes"]) / total_polls
+        return hour_rate > overall_rate * 1.5
+
+    def _interval(self, s: dict, now: float) -> float:
+        """Seconds until the next poll for a source, given its change history."""
+        min_s = config.POLL_MIN_MINUTES * 60
+        max_s = config.POLL_MAX_MINUTES * 60
+        interval = max_s - (max_s - min_s) * s["rate"]
+        if self._is_busy_hour(s, time.localtime(now).tm_hour):
+            interval /= config.POLL_BUSY_BOOST
+        return max(min_s, min(max_s, interval))
+
+    def record(self, source_id: str, signature: str | None, now: float | None = None) -> None:
+        """Record a poll and schedule the next one.
+
+        `signature` identifies the in-stock set and prices seen; pass None for
+        a failed poll, which reschedules without touching the statistics.
+        """
+        now = now or time.time()
+        s = self.sources.setdefault(source_id, _new_source())
+
+        if signature is not None:
+            if s["signature"] is not None:
+                changed = signature != s["signature"]
+                alpha = config.POLL_EWMA_ALPHA
+                s["rate"] = alpha * changed + (1 - alpha) * s["rate"]
+                hour = time.localtime(now).tm_hour
+                s["hour_polls"][hour] += 1
+                s["hour_changes"][hour] += changed
+            s["signature"] = signature
+
+        s["interval"] = self._interval(s, now)
+        s["next_due"] = now + s["interval"]
+
+    def due(self, now: float | None = None) -> list[str]:
+        """Return the sources whose next poll is due."""
+        now = now or time.time()
+        return [source_id for source_id, s in self.sources.items()
+                if source_id in self.known and s["next_due"] <= now]
+
+    def seconds_until_next(self, now: float | None = None) -> float:
+        """Seconds until the earliest scheduled poll (0 if one is already due)."""
+        now = now or time.time()
+        due_times = [s["next_due"] for source_id, s in self.sources.items() if source_id in self.known]
+        if not due_times:
+            return config.POLL_MAX_MINUTES * 60
+        return max(0.0, min(due_times) - now)
+
+    def describe(self) -> str:
+        """One-line summary of current intervals, for the run log."""
+        return ", ".join(
+            f"{source_id} {s['interval'] / 60:.0f}m (rate {s['rate']:.2f})"
+            for source_id, s in self.sources.items()
+        )
+
+    def save(self) -> None:
+        """Persist polling statistics."""
+        with open(self.filepath, "w") as f:
+            json.dump(self.sources, f, separators=(",", ":"))
@@ -1,71 +1,36 @@
 # LEGACY: Kept as fallback. Primary deal evaluation is now handled by SilverStack dashboard.
-import json
-import os
+import threading
 import time
 
 import requests
 
 import config
-from services.rate_limiter import can_make_request, record_request, get_remaining_requests, get_available_key
+from services.rate_limiter import api_key_limiter, get_available_key, get_remaining_requests, record_request
+from services.state_store import get_store
 
 
-CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "spot_price_cache.json")
-
-
-def _load_cached_price() -> float | None:
-    """Return cached spot price if fresh (within SPOT_PRICE_CACHE_HOURS), else None."""
-    if not os.path.exists(CACHE_FILE):
-        return None
-    try:
-        with open(CACHE_FILE, "r") as f:
-            data = json.load(f)
-        fetched_at = data["fetched_at"]
-        max_age = config.SPOT_PRICE_CACHE_HOURS * 3600
-        if time.time() - fetched_at < max_age:
-            return data["price"]
-    except (json.JSONDecodeError, KeyError, IOError):
-        pass
-    return None
-
-
-def _save_cached_price(price: float) -> None:
-    """Write spot price and timestamp to cache file."""
-    with open(CACHE_FILE, "w") as f:
-        json.dump({"price": price, "fetched_at": time.time()}, f, indent=2)
-
-
-class SilverPriceService:
-    """Fetches the current silver spot price in EUR from GoldAPI.io."""
+class GoldApiProvider:
+    """Spot price from GoldAPI.io, rotating across the configured monthly-limited keys."""
 
+    name = "goldapi"
     BASE_URL = "https://www.goldapi.io/api/XAG/EUR"
 
-    def get_spot_price_eur(self) -> float | None:
-        """Return the current silver spot price per troy ounce in EUR.
-
-        Uses a local cache to avoid burning API requests when the cached
-        value is less than SPOT_PRICE_CACHE_HOURS old.
-        Returns None if the request fails or the monthly limit is reached.
-        """
-        cached = _load_cached_price()
-        if cached is not None:
-            print(f"[SilverPrice] Using cached spot price: EUR {cached:.2f} (cache < {config.SPOT_PRICE_CACHE_HOURS}h old)")
-            return cached
-
+    def fetch(self) -> float | None:
+        """Return the silver spot price per troy ounce in EUR, or None on any failure."""
         api_key = get_available_key(config.SILVER_API_KEYS)
         if api_key is None:
-            print(f"[SilverPrice] All API keys exhausted ({config.MONTHLY_API_LIMIT} requests/key).")
-            print(f"[SilverPrice] Limit resets at the start of next month.")
+            print(f"[SilverPrice] All GoldAPI keys exhausted ({config.MONTHLY_API_LIMIT} requests/key).")
             return None
 
-        remaining = get_remaining_requests()
-        print(f"[SilverPrice] API requests remaining this month: {remaining}")
-
-        headers = {
-            "x-access-token": api_key,
-        }
+        wait = api_key_limiter.wait_time(api_key)
+        if wait > 0:
+            print(f"[SilverPrice] GoldAPI key paced, next request allowed in {wait:.0f}s")
+            return None
+        api_key_limiter.reserve(api_key)
 
+        print(f"[SilverPrice] GoldAPI requests remaining this month: {get_remaining_requests()}")
         try:
-            resp = requests.get(self.BASE_URL, headers=headers, timeout=10)
+            resp = requests.get(self.BASE_URL, headers={"x-access-token": api_key}, timeout=10)
             resp.raise_for_status()
             data = resp.json()
 
@@ -74,16 +39,114 @@ class SilverPriceService:
             record_request(api_key)
 
             if "error" in data:
-                print(f"[SilverPrice] API error: {data['error']}")
+                print(f"[SilverPrice] GoldAPI error: {data['error']}")
                 return None
-
-            spot_price = round(data["price"], 2)
-            _save_cached_price(spot_price)
-            return spot_price
+            return round(data["price"], 2)
 
         except requests.RequestException as e:
-            print(f"[SilverPrice] Request failed: {e}")
+            print(f"[SilverPrice] GoldAPI request failed: {e}")
             return None
-        except (KeyError, TypeError) as e:
-            print(f"[SilverPrice] Failed to parse response: {e}")
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[SilverPrice] Failed to parse GoldAPI response: {e}")
             return None
+
+
+class StubProvider:
+    """Local provider returning a fixed price (or None to simulate an outage), for tests."""
+
+    name = "stub"
+
+    def __init__(self, price: float | None = None, delay: float = 0.0):
+        self.price = price
+        self.delay = delay
+        self.calls = 0
+
+    def fetch(self) -> float | None:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self.price
+
+
+class SilverPriceService:
+    """Silver spot price in EUR with stale-while-revalidate caching and provider failover.
+
+    The last known price is kept in memory, seeded once from the state store.
+    A fresh price (younger than SPOT_PRICE_CACHE_HOURS) is returned directly;
+    a stale one (up to SPOT_PRICE_MAX_STALE_HOURS) is returned immediately
+    while a single background refresh asks each provider in order until one
+    answers. Callers therefore never wait on the network unless they ask to
+    on a cold start.
+    """
+
+    def __init__(self, providers: list | None = None, persist: bool = True):
+        self.providers = providers if providers is not None else [GoldApiProvider()]
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._price: float | None = None
+        self._fetched_at = 0.0
+        self._loaded = False
+        self._refresh: threading.Thread | None = None
+
+    def _load(self) -> None:
+        """Seed the in-memory value from the state store. Caller must hold _lock."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.persist:
+            cached = get_store().get_spot()
+            if cached is not None:
+                self._price, self._fetched_at = cached
+
+    def refresh(self) -> float | None:
+        """Fetch from the providers in order (blocking) and cache the first answer."""
+        for provider in self.providers:
+            price = provider.fetch()
+            if price is None:
+                continue
+            now = time.time()
+            with self._lock:
+                self._price, self._fetched_at = price, now
+            if self.persist:
+                get_store().set_spot(price, now)
+            print(f"[SilverPrice] Refreshed spot price from {provider.name}: EUR {price:.2f}")
+            return price
+        print("[SilverPrice] No provider returned a spot price")
+        return None
+
+    def _refresh_in_background(self) -> threading.Thread:
+        """Start a refresh unless one is already running. Caller must hold _lock."""
+        if self._refresh is None or not self._refresh.is_alive():
+            self._refresh = threading.Thread(target=self.refresh, name="spot-price-refresh", daemon=True)
+            self._refresh.start()
+        return self._refresh
+
+    def get_spot_price_eur(self, wait: float = 0.0) -> float | None:
+        """Return the current silver spot price per troy ounce in EUR.
+
+        Never blocks when a usable price is cached. With nothing usable
+        cached, a refresh is started and this waits up to `wait` seconds for
+        it (default: not at all). Returns None if no price is available.
+        """
+        with self._lock:
+            self._load()
+            age = time.time() - self._fetched_at
+            if self._price is not None and age < config.SPOT_PRICE_CACHE_HOURS * 3600:
+                return self._price
+
+            refresh = self._refresh_in_background()
+            if self._price is not None and age < config.SPOT_PRICE_MAX_STALE_HOURS * 3600:
+                return self._price
+
+        if wait:
+            refresh.join(wait)
+        with self._lock:
+            fresh = time.time() - self._fetched_at < config.SPOT_PRICE_MAX_STALE_HOURS * 3600
+            return self._price if fresh else None
+
+    def wait_for_refresh(self, timeout: float | None = None) -> None:
+        """Block until an in-flight background refresh finishes (for shutdown and tests)."""
+        with self._lock:
+            refresh = self._refresh
+        if refresh is not None:
+            refresh.join(timeout)
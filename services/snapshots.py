@@ -0,0 +1,150 @@
+import hashlib
+import threading
+import time
+from array import array
+
+import config
+from core import metrics
+from services.state_store import get_store
+
+
+def url_hash(url: str) -> int:
+    """Stable 64-bit hash of a product URL."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class Snapshot:
+    """A source's in-stock set at one run: sorted URL hashes with parallel prices per oz."""
+
+    __slots__ = ("hashes", "prices", "taken_at")
+
+    def __init__(self, hashes: bytes = b"", prices: bytes = b"", taken_at: float = 0.0):
+        self.hashes = array("Q", hashes)
+        self.prices = array("f", prices)
+        self.taken_at = taken_at
+
+
+def diff(previous: Snapshot, hashes: list[int], prices: list[float]) -> tuple[list, list, list]:
+    """Linear merge of two sorted snapshots.
+
+    Returns (restocked indexes into `hashes`, out-of-stock hashes from
+    `previous`, price drops as (index into `hashes`, previous price)).
+    """
+    restocked, gone, dropped = [], [], []
+    threshold = 1 - config.SNAPSHOT_PRICE_DROP_PCT / 100
+    i = j = 0
+    old, old_prices = previous.hashes, previous.prices
+    while i < len(old) or j < len(hashes):
+        if j == len(hashes) or (i < len(old) and old[i] < hashes[j]):
+            gone.append(old[i])
+            i += 1
+        elif i == len(old) or hashes[j] < old[i]:
+            restocked.append(j)
+            j += 1
+        else:
+            if prices[j] < old_prices[i] * threshold:
+                dropped.append((j, round(old_prices[i], 2)))
+            i += 1
+            j += 1
+    return restocked, gone, dropped
+
+
+class SnapshotDiffer:
+    """Detects restock, out-of-stock and price-drop events between consecutive runs.
+
+    Products are staged per source as they stream in from the parsers; when a
+    source finishes, its new snapshot is merged against the previous one and
+    the events are returned right away. Each event carries the time its
+    product was scraped, so downstream alerting can measure end-to-end
+    latency. A source's first snapshot produces no events.
+    """
+
+    def __init__(self):
+        self._snapshots: dict[str, Snapshot] | None = None
+        self._pending: dict[str, dict[int, tuple[float, dict, float]]] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _get_snapshots(self) -> dict[str, Snapshot]:
+        """Return all snapshots, loading them on first use. Caller must hold _lock."""
+        if self._snapshots is None:
+            self._snapshots = {
+                source_id: Snapshot(hashes, prices, taken_at)
+                for source_id, taken_at, hashes, prices in get_store().load_snapshots()
+            }
+        return self._snapshots
+
+    def add(self, product: dict, source: str) -> None:
+        """Stage one in-stock product seen this run."""
+        staged = (product["price_per_oz"], product, time.time())
+        with self._lock:
+            # Listed twice (e.g. on two pages): the first one wins
+            self._pending.setdefault(source, {}).setdefault(url_hash(product["url"]), staged)
+
+    def discard_source(self, source: str) -> None:
+        """Forget what a failed or abandoned source staged; its previous snapshot stays."""
+        with self._lock:
+            self._pending.pop(source, None)
+
+    def finish_source(self, source: str) -> list[dict]:
+        """Close a fully scraped source and return its events, oldest scrape first."""
+        now = time.time()
+        with self._lock:
+            staged = self._pending.pop(source, {})
+            hashes = sorted(staged)
+            prices = [staged[h][0] for h in hashes]
+            previous = self._get_snapshots().get(source)
+
+            snapshot = Snapshot(taken_at=now)
+            snapshot.hashes.extend(hashes)
+            snapshot.prices.extend(prices)
+            self._snapshots[source] = snapshot
+            self._dirty.add(source)
+
+        if previous is None:
+            return []
+
+        restocked, gone, dropped = diff(previous, hashes, prices)
+        events = []
+        for j in restocked:
+            _price, product, scraped_at = staged[hashes[j]]
+            events.append({**product, "event": "restock", "source": source,
+                           "scraped_at": scraped_at, "detected_at": now})
+        for j, previous_price in dropped:
+            _price, product, scraped_at = staged[hashes[j]]
+            events.append({**product, "event": "price_drop", "source": source,
+                           "previous_price_per_oz": previous_price,
+                           "scraped_at": scraped_at, "detected_at": now})
+        for h in gone:
+            events.append({"event": "out_of_stock", "source": source, "url_hash": h, "detected_at": now})
+
+        for e in events:
+            metrics.incr("events", event=e["event"], dealer=source)
+            if "scraped_at" in e:
+                metrics.observe("event_detect_seconds", now - e["scraped_at"], dealer=source)
+        return sorted(events, key=lambda e: e.get("scraped_at", now))
+
+    def save(self) -> None:
+        """Persist the snapshots taken since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = [
+                (source, s.taken_at, s.hashes.tobytes(), s.prices.tobytes())
+                for source, s in self._get_snapshots().items() if source in self._dirty
+            ]
+            self._dirty.clear()
+        get_store().save_snapshots(rows)
+
+
+_differ: SnapshotDiffer | None = None
+_differ_lock = threading.Lock()
+
+
+def get_differ() -> SnapshotDiffer:
+    """Return the process-wide snapshot differ."""
+    global _differ
+    with _differ_lock:
+        if _differ is None:
+            _differ = SnapshotDiffer()
+        return _differ
@@ -0,0 +1,379 @@
+import json
+import os
+import sqlite3
+import threading
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+DB_FILE = os.path.join(ROOT_DIR, "silverscout.db")
+
+# JSON snapshots read by services.gist_sync and the Telegram worker
+DEALS_JSON = os.path.join(ROOT_DIR, "notified_deals.json")
+USAGE_JSON = os.path.join(ROOT_DIR, "api_usage.json")
+SPOT_JSON = os.path.join(ROOT_DIR, "spot_price_cache.json")
+HEALTH_JSON = os.path.join(ROOT_DIR, "health_state.json")
+BEST_OFFERS_JSON = os.path.join(ROOT_DIR, "best_offers.json")
+
+SPOT_KEY = "XAG/EUR"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    url          TEXT PRIMARY KEY,
+    price_per_oz REAL NOT NULL,
+    total_price  REAL NOT NULL,
+    notified_at  REAL NOT NULL DEFAULT (strftime('%s', 'now'))
+);
+CREATE INDEX IF NOT EXISTS deals_notified_at ON deals (notified_at);
+
+CREATE TABLE IF NOT EXISTS api_usage (
+    month  TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    count  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, key_id)
+);
+
+CREATE TABLE IF NOT EXISTS spot_prices (
+    pair       TEXT PRIMARY KEY,
+    price      REAL NOT NULL,
+    fetched_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS price_history (
+    source_id TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    ts        BLOB NOT NULL,
+    total     BLOB NOT NULL,
+    ppo       BLOB NOT NULL,
+    PRIMARY KEY (source_id, url)
+);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    source_id TEXT PRIMARY KEY,
+    taken_at  REAL NOT NULL,
+    hashes    BLOB NOT NULL,
+    prices    BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS details (
+    url        TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    data       TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS dealer_health (
+    source_id TEXT PRIMARY KEY,
+    data      TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS offers (
+    source_id    TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    key          TEXT NOT NULL,
+    price_per_oz REAL NOT NULL,
+    data         TEXT NOT NULL,
+    PRIMARY KEY (source_id, url)
+);
+CREATE INDEX IF NOT EXISTS offers_key ON offers (key);
+
+CREATE TABLE IF NOT EXISTS detail_failures (
+    url       TEXT PRIMARY KEY,
+    failures  INTEGER NOT NULL,
+    failed_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class StateStore:
+    """Embedded SQLite (WAL) store for notified deals, API usage and cached prices.
+
+    Every read is an indexed lookup and every write a small transaction, so
+    state access no longer grows with the deal history and a crash mid-run
+    cannot leave a half-written JSON file behind. export_json() produces the
+    legacy JSON files for the Gist sync and the Telegram worker.
+    """
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._import_legacy_json()
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _transaction(self, statements: list[tuple[str, tuple]]) -> None:
+        """Run several writes atomically."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _import_legacy_json(self) -> None:
+        """One-time import of the old JSON state files into empty tables."""
+        statements = []
+        if not self._execute("SELECT 1 FROM deals LIMIT 1"):
+            for url, d in _read_json(DEALS_JSON).items():
+                statements.append((
+                    "INSERT OR IGNORE INTO deals (url, price_per_oz, total_price) VALUES (?, ?, ?)",
+                    (url, d["price_per_oz"], d["total_price"]),
+                ))
+        if not self._execute("SELECT 1 FROM api_usage LIMIT 1"):
+            usage = _read_json(USAGE_JSON)
+            for key_id, count in usage.get("keys", {}).items():
+                statements.append((
+                    "INSERT OR IGNORE INTO api_usage (month, key_id, count) VALUES (?, ?, ?)",
+                    (usage.get("month", ""), key_id, count),
+                ))
+        if not self._execute("SELECT 1 FROM spot_prices LIMIT 1"):
+            spot = _read_json(SPOT_JSON)
+            if "price" in spot and "fetched_at" in spot:
+                statements.append((
+                    "INSERT OR IGNORE INTO spot_prices (pair, price, fetched_at) VALUES (?, ?, ?)",
+                    (SPOT_KEY, spot["price"], spot["fetched_at"]),
+                ))
+        if not self._execute("SELECT 1 FROM dealer_health LIMIT 1"):
+            for source_id, record in _read_json(HEALTH_JSON).items():
+                statements.append((
+                    "INSERT OR IGNORE INTO dealer_health (source_id, data) VALUES (?, ?)",
+                    (source_id, json.dumps(record, separators=(",", ":"))),
+                ))
+        if statements:
+            self._transaction(statements)
+
+    # --- Deals ---
+
+    def get_deal(self, url: str) -> tuple[float, float] | None:
+        """Return (price_per_oz, total_price) last notified for a URL, or None."""
+        rows = self._execute("SELECT price_per_oz, total_price FROM deals WHERE url = ?", (url,))
+        return rows[0] if rows else None
+
+    def upsert_deals(self, deals: dict) -> None:
+        """Insert or update deals given as {url: {price_per_oz, total_price}}."""
+        self._transaction([
+            (
+                "INSERT INTO deals (url, price_per_oz, total_price, notified_at) "
+                "VALUES (?, ?, ?, strftime('%s', 'now')) "
+                "ON CONFLICT (url) DO UPDATE SET price_per_oz = excluded.price_per_oz, "
+                "total_price = excluded.total_price, notified_at = excluded.notified_at",
+                (url, d["price_per_oz"], d["total_price"]),
+            )
+            for url, d in deals.items()
+        ])
+
+    def all_deals(self) -> dict:
+        """Return every deal as {url: {price_per_oz, total_price}}, oldest first."""
+        rows = self._execute("SELECT url, price_per_oz, total_price FROM deals ORDER BY notified_at")
+        return {url: {"price_per_oz": ppo, "total_price": total} for url, ppo, total in rows}
+
+    # --- API usage ---
+
+    def get_usage(self, month: str) -> dict:
+        """Return {key_id: count} for a month."""
+        return dict(self._execute("SELECT key_id, count FROM api_usage WHERE month = ?", (month,)))
+
+    def increment_usage(self, month: str, counts: dict[str, int]) -> None:
+        """Add {key_id: amount} to the keys' request counts for a month, atomically."""
+        self._transaction([
+            (
+                "INSERT INTO api_usage (month, key_id, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (month, key_id) DO UPDATE SET count = count + excluded.count",
+                (month, key_id, amount),
+            )
+            for key_id, amount in counts.items()
+        ])
+
+    def latest_month(self) -> str | None:
+        """Return the most recent month with recorded usage."""
+        rows = self._execute("SELECT MAX(month) FROM api_usage")
+        return rows[0][0] if rows else None
+
+    # --- Spot prices ---
+
+    def get_spot(self, pair: str = SPOT_KEY) -> tuple[float, float] | None:
+        """Return (price, fetched_at) for a currency pair, or None."""
+        rows = self._execute("SELECT price, fetched_at FROM spot_prices WHERE pair = ?", (pair,))
+        return rows[0] if rows else None
+
+    def set_spot(self, price: float, fetched_at: float, pair: str = SPOT_KEY) -> None:
+        """Store the latest price for a currency pair."""
+        self._transaction([(
+            "INSERT INTO spot_prices (pair, price, fetched_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (pair) DO UPDATE SET price = excluded.price, fetched_at = excluded.fetched_at",
+            (pair, price, fetched_at),
+        )])
+
+    # --- Price history ---
+
+    def load_price_series(self) -> list[tuple[str, str, bytes, bytes, bytes]]:
+        """Return every (source_id, url, ts, total, ppo) row of packed price columns."""
+        return self._execute("SELECT source_id, url, ts, total, ppo FROM price_history")
+
+    def save_price_series(self, rows: list[tuple[str, str, bytes, bytes, bytes]]) -> None:
+        """Replace the packed price columns of the given series."""
+        self._transaction([
+            ("INSERT OR REPLACE INTO price_history (source_id, url, ts, total, ppo) "
+             "VALUES (?, ?, ?, ?, ?)", row)
+            for row in rows
+        ])
+
+    def delete_price_series(self, keys: list[tuple[str, str]]) -> None:
+        """Drop the packed price columns of the given (source_id, url) series."""
+        self._transaction([
+            ("DELETE FROM price_history WHERE source_id = ? AND url = ?", key)
+            for key in keys
+        ])
+
+    # --- In-stock snapshots ---
+
+    def load_snapshots(self) -> list[tuple[str, float, bytes, bytes]]:
+        """Return every (source_id, taken_at, hashes, prices) snapshot row."""
+        return self._execute("SELECT source_id, taken_at, hashes, prices FROM snapshots")
+
+    def save_snapshots(self, rows: list[tuple[str, float, bytes, bytes]]) -> None:
+        """Replace the latest snapshot of the given sources."""
+        self._transaction([
+            ("INSERT OR REPLACE INTO snapshots (source_id, taken_at, hashes, prices) VALUES (?, ?, ?, ?)", row)
+            for row in rows
+        ])
+
+    # --- Dealer health (services.health) ---
+
+    def load_health(self) -> dict:
+        """Return {source_id: health record} for every dealer."""
+        rows = self._execute("SELECT source_id, data FROM dealer_health")
+        return {source_id: json.loads(data) for source_id, data in rows}
+
+    def save_health(self, records: dict) -> None:
+        """Replace the health records of the given dealers."""
+        self._transaction([
+            ("INSERT OR REPLACE INTO dealer_health (source_id, data) VALUES (?, ?)",
+             (source_id, json.dumps(record, separators=(",", ":"))))
+            for source_id, record in records.items()
+        ])
+
+    # --- Cross-dealer offers (core.catalog) ---
+
+    def load_offers(self) -> list[tuple[str, str, dict]]:
+        """Return every (source_id, key, offer) of the product index."""
+        rows = self._execute("SELECT source_id, key, data FROM offers")
+        return [(source_id, key, json.loads(data)) for source_id, key, data in rows]
+
+    def replace_offers(self, source_id: str, offers: list[tuple[str, dict]]) -> None:
+        """Replace a source's offers with the given (key, offer) pairs."""
+        self._transaction([("DELETE FROM offers WHERE source_id = ?", (source_id,))] + [
+            ("INSERT OR REPLACE INTO offers (source_id, url, key, price_per_oz, data) VALUES (?, ?, ?, ?, ?)",
+             (source_id, offer["url"], key, offer["price_per_oz"], json.dumps(offer, separators=(",", ":"))))
+            for key, offer in offers
+        ])
+
+    def best_offers(self) -> dict:
+        """Return {key: offer} with the cheapest offer (by price per oz) of every product."""
+        # SQLite returns the bare column from the row holding MIN()
+        rows = self._execute("SELECT key, data, MIN(price_per_oz) FROM offers GROUP BY key ORDER BY key")
+        return {key: json.loads(data) for key, data, _price in rows}
+
+    # --- Product details ---
+
+    def get_details(self, url: str) -> tuple[float, dict] | None:
+        """Return (fetched_at, details) cached for a product URL, or None."""
+        rows = self._execute("SELECT fetched_at, data FROM details WHERE url = ?", (url,))
+        return (rows[0][0], json.loads(rows[0][1])) if rows else None
+
+    def set_details(self, url: str, details: dict, fetched_at: float) -> None:
+        """Cache the details extracted from a product's detail page (and forget past failures)."""
+        self._transaction([
+            ("INSERT OR REPLACE INTO details (url, fetched_at, data) VALUES (?, ?, ?)",
+             (url, fetched_at, json.dumps(details, separators=(",", ":")))),
+            ("DELETE FROM detail_failures WHERE url = ?", (url,)),
+        ])
+
+    def get_detail_failure(self, url: str) -> tuple[int, float] | None:
+        """Return (consecutive failures, last failed_at) of a product's detail page, or None."""
+        rows = self._execute("SELECT failures, failed_at FROM detail_failures WHERE url = ?", (url,))
+        return rows[0] if rows else None
+
+    def set_detail_failure(self, url: str, failures: int, failed_at: float) -> None:
+        """Record a failed detail page fetch."""
+        self._transaction([(
+            "INSERT OR REPLACE INTO detail_failures (url, failures, failed_at) VALUES (?, ?, ?)",
+            (url, failures, failed_at),
+        )])
+
+    # --- Metadata ---
+
+    def get_meta(self, key: str) -> str | None:
+        """Return a small bookkeeping value (e.g. upload hashes), or None."""
+        rows = self._execute("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        """Store a small bookkeeping value."""
+        self._transaction([(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )])
+
+    # --- Export ---
+
+    def export_json(self) -> None:
+        """Write the JSON files services.gist_sync and the worker expect.
+
+        Also checkpoints the WAL so the single .db file is self-contained.
+        """
+        _write_json(DEALS_JSON, self.all_deals())
+
+        month = self.latest_month()
+        if month:
+            _write_json(USAGE_JSON, {"month": month, "keys": self.get_usage(month)})
+
+        spot = self.get_spot()
+        if spot:
+            _write_json(SPOT_JSON, {"price": spot[0], "fetched_at": spot[1]})
+
+        best = self.best_offers()
+        if best:
+            _write_json(BEST_OFFERS_JSON, best)
+
+        self._execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def _read_json(filepath: str) -> dict:
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        with open(filepath, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def _write_json(filepath: str, data: dict) -> None:
+    with open(filepath, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+_store: StateStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> StateStore:
+    """Return the process-wide state store, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StateStore()
+        return _store